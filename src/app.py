@@ -10,15 +10,17 @@ from utils import setup_logging
 
 async def main():
     setup_logging(level="DEBUG", logs_base_path=LOGS_DIR)
-    logger.disable("core.sheets._parser")
 
     logger.info("Запуск приложения.")
     settings = ApplicationSettings.load()
     hostel_sheets = GoogleSheetHostel(settings=settings)
     vk_manager = VKManager(settings=settings, hostel_sheets=hostel_sheets)
     hostel_task = create_task(hostel_sheets.start())
-    await vk_manager.run()
-    hostel_task.cancel()
+    try:
+        await vk_manager.run()
+    finally:
+        hostel_task.cancel()
+        await hostel_sheets.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,142 @@
+"""
+Скорость разбора листа: прежний UserParser против текущего на синтетических листах
+из 1k, 10k и 100k строк. Лист содержит заголовки этажей, шапки комнат, пустые строки,
+ФИО c номерами ("12. Иванов"), пустые и нечисловые vk_id.
+
+Запуск из каталога src:
+    python -m benchmarks.parser
+"""
+
+from random import Random
+from time import perf_counter
+
+from loguru import logger
+
+from core.sheets._models import USER_ROW_WIDTH, IndexedRow, Rows, User, UserRowSection
+from core.sheets._parser import UserParser
+
+SEED = 181
+REPEATS = 5
+
+
+class LegacyUserParser:
+    """Прежний разбор строки: kwargs на строку, посимвольная чистка ФИО, лог на строку."""
+
+    def __init__(self):
+        self.last_room: int | None = None
+
+    @staticmethod
+    def check_fullname(row: IndexedRow) -> str:
+        fullname = row.data[UserRowSection.FULLNAME.index]
+        while fullname and (fullname[0].isdigit() or fullname[0] in (".", " ")):
+            fullname = fullname[1:]
+        return fullname
+
+    def parse_user_row(self, row: IndexedRow) -> User | None:
+        named_arguments = {"row_index": row.index, "vk_id": None, "tg_id": None}
+        if not row.data:
+            return None
+        data = row.data
+
+        room: str = data[UserRowSection.ROOM.index]
+        if "этаж" in room.lower() or "комната" in room.lower():
+            return None
+        if room.isdigit():
+            self.last_room = int(room)
+        elif room:
+            return None
+        named_arguments["room"] = self.last_room
+
+        fullname = self.check_fullname(row)
+        if not fullname:
+            return None
+        named_arguments["fullname"] = fullname
+
+        vk_id: str = data[UserRowSection.VK_ID.index]
+        logger.debug("vk id: {}", vk_id)
+        if vk_id.isdigit():
+            named_arguments["vk_id"] = int(vk_id)
+        tg_id: str = data[UserRowSection.TG_ID.index]
+        if tg_id.isdigit():
+            named_arguments["tg_id"] = int(tg_id)
+        named_arguments["is_in_vk_conversation"] = (
+            data[UserRowSection.IN_VK_CONVERSATION.index] == "TRUE"
+        )
+        named_arguments["is_in_tg_conversation"] = (
+            data[UserRowSection.IN_TG_CONVERSATION.index] == "TRUE"
+        )
+        return User(**named_arguments)
+
+
+def make_rows(count: int, seed: int = SEED) -> Rows:
+    random = Random(seed)
+    rows: Rows = []
+    room = 100
+    while len(rows) < count:
+        if len(rows) % 200 == 0:
+            rows.append([f"{room // 100} этаж"] + [""] * (USER_ROW_WIDTH - 1))
+            rows.append(["Комната", "ФИО"] + [""] * (USER_ROW_WIDTH - 2))
+        room += 1
+        for place in range(random.randint(2, 4)):
+            row = [""] * USER_ROW_WIDTH
+            if place == 0:
+                row[UserRowSection.ROOM.index] = str(room)
+            kind = random.random()
+            if kind < 0.1:
+                rows.append([])
+                continue
+            if kind < 0.2:
+                rows.append(row)
+                continue
+            number = f"{len(rows)}. " if kind < 0.5 else ""
+            row[UserRowSection.FULLNAME.index] = f"{number}Иванов Иван Иванович {len(rows)}"
+            if kind < 0.8:
+                row[UserRowSection.VK_ID.index] = str(100_000_000 + len(rows))
+            elif kind < 0.9:
+                row[UserRowSection.VK_ID.index] = "нет"
+            row[UserRowSection.IN_VK_CONVERSATION.index] = "TRUE" if kind < 0.7 else "FALSE"
+            rows.append(row)
+    return rows[:count]
+
+
+def _parse(parser: UserParser | LegacyUserParser, rows: Rows) -> list[User]:
+    return [
+        user
+        for offset, data in enumerate(rows)
+        if (user := parser.parse_user_row(IndexedRow(offset, data))) is not None
+    ]
+
+
+def _measure(factory: type, rows: Rows) -> tuple[float, list[User]]:
+    """Лучшее время из REPEATS прогонов."""
+    best = float("inf")
+    users: list[User] = []
+    for _ in range(REPEATS):
+        started = perf_counter()
+        users = _parse(factory(), rows)
+        best = min(best, perf_counter() - started)
+    return best, users
+
+
+def main() -> None:
+    for count in (1_000, 10_000, 100_000):
+        rows = make_rows(count)
+        # Как в приложении до переписывания: отладочный лог парсера выключен.
+        logger.disable(__name__)
+        legacy, legacy_users = _measure(LegacyUserParser, rows)
+        logger.enable(__name__)
+        current, users = _measure(UserParser, rows)
+        if users != legacy_users:
+            logger.error("Результаты разбора различаются на {} строках!", count)
+        logger.info(
+            "{:>7} строк ({} польз.): прежний {:.1f} мс, текущий {:.1f} мс ({:.0%})",
+            count,
+            len(users),
+            legacy * 1000,
+            current * 1000,
+            current / legacy,
+        )
+
+
+if __name__ == "__main__":
+    main()
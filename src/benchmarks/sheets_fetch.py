@@ -0,0 +1,78 @@
+"""
+Сравнение режимов загрузки листа базы: "rows" (диапазон на строку), "block"
+и "block" c проекцией колонок, которые читает парсер ("proj").
+
+Запуск из каталога src (нужны .env и service_account.json):
+    python -m benchmarks.sheets_fetch [повторов]
+"""
+
+import sys
+from asyncio import run
+from json import dumps
+from statistics import median
+from time import perf_counter
+
+from loguru import logger
+
+from core.sheets import SheetFetcher
+from core.sheets._parser import UserParser
+from integration.google_sheets import GoogleSheetsApiClient
+from settings import ApplicationSettings
+
+
+def _estimate_payload(ranges: list[str], rows: list) -> int:
+    """Примерный размер ответа batchGet: по объекту valueRange на каждый диапазон."""
+    per_range = [{"range": r, "majorDimension": "ROWS", "values": []} for r in ranges]
+    return len(dumps({"valueRanges": per_range}, ensure_ascii=False).encode()) + len(
+        dumps(rows, ensure_ascii=False).encode()
+    )
+
+
+async def main(repeats: int) -> None:
+    settings = ApplicationSettings.load()
+    api = GoogleSheetsApiClient(
+        service_account_path=settings.get_service_account_file_path(),
+        spreadsheet_id=settings.SPREADSHEET_ID,
+    )
+    await api.connect()
+
+    variants = (
+        ("rows", "rows", None),
+        ("block", "block", None),
+        ("proj", "block", UserParser.required_sections),
+    )
+    for name, mode, sections in variants:
+        fetcher = SheetFetcher(
+            api,
+            sheet_name=settings.DATABASE_SHEET_NAME,
+            start_index=settings.DATABASE_SHEET_START_RANGE,
+            end_index=settings.DATABASE_SHEET_END_RANGE,
+            mode=mode,
+            chunk_rows=settings.DATABASE_FETCH_CHUNK_ROWS,
+            sections=sections,
+        )
+        ranges = fetcher.ranges()
+        request = api.sheets_service.values.batchGet(
+            spreadsheetId=settings.SPREADSHEET_ID, ranges=ranges
+        )
+        timings = []
+        rows = []
+        for _ in range(repeats):
+            started = perf_counter()
+            rows = await fetcher.fetch()
+            timings.append(perf_counter() - started)
+        logger.info(
+            "{:>5}: диапазонов {:>4}, URL {:>6} байт, ответ ~{:>7} байт, строк {:>4}, "
+            "медиана {:.3f} с (мин {:.3f} с)",
+            name,
+            len(ranges),
+            len(str(request.url).encode()),
+            _estimate_payload(ranges, rows),
+            len(rows),
+            median(timings),
+            min(timings),
+        )
+
+
+if __name__ == "__main__":
+    run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 5))
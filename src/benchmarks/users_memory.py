@@ -0,0 +1,71 @@
+"""
+Память на одного пользователя: прежний dataclass на __dict__ против текущего User на __slots__.
+
+Запуск из каталога src:
+    python -m benchmarks.users_memory
+"""
+
+import gc
+import tracemalloc
+from dataclasses import dataclass
+
+from loguru import logger
+
+from core.sheets._models import User
+
+
+@dataclass(frozen=False, kw_only=True)
+class LegacyUser:
+    row_index: int
+    room: int
+    fullname: str
+    vk_id: int | None
+    tg_id: str | None
+    is_in_vk_conversation: bool
+    is_in_tg_conversation: bool
+    is_normalize: bool = False
+
+
+def _make_fields(count: int) -> list[dict]:
+    return [
+        {
+            "row_index": index,
+            "room": 100 + index // 4,
+            "fullname": f"Иванов Иван Иванович {index}",
+            "vk_id": 100_000_000 + index,
+            "tg_id": None,
+            "is_in_vk_conversation": index % 2 == 0,
+            "is_in_tg_conversation": False,
+        }
+        for index in range(count)
+    ]
+
+
+def _measure(factory: type, fields: list[dict]) -> float:
+    """Байт на пользователя без учета самих значений полей (они общие для обоих вариантов)."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    users = [factory(**kwargs) for kwargs in fields]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del users
+    return (after - before) / len(fields)
+
+
+def main() -> None:
+    for count in (10_000, 100_000):
+        fields = _make_fields(count)
+        legacy = _measure(LegacyUser, fields)
+        slotted = _measure(User, fields)
+        logger.info(
+            "{:>7} пользователей: прежний {:.1f} Б/польз., __slots__ {:.1f} Б/польз. ({:.0%})",
+            count,
+            legacy,
+            slotted,
+            slotted / legacy,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,14 @@
+from ._engine import ParseEngine
+from ._fetcher import SheetFetcher
 from ._hostel_sheets import GoogleSheetHostel
+from ._store import UserStore
+from ._sync import SheetSync, SyncResult
 
-__all__ = ["GoogleSheetHostel"]
+__all__ = [
+    "GoogleSheetHostel",
+    "ParseEngine",
+    "SheetFetcher",
+    "SheetSync",
+    "SyncResult",
+    "UserStore",
+]
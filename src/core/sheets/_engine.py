@@ -0,0 +1,132 @@
+from asyncio import gather, get_running_loop, to_thread
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from time import perf_counter
+from typing import TYPE_CHECKING, Literal
+
+from loguru import logger
+
+from ._models import IndexedRow, RowIndex, Rows, User, UserRowSection
+from ._parser import UserParser
+
+if TYPE_CHECKING:
+    from ._sync import SheetSync, SyncResult
+
+ParseExecutor = Literal["process", "thread"]
+ParsedRow = tuple[User | None, int | None]
+
+
+def parse_rows(rows: Rows, start_index: RowIndex, sheet_name: str) -> list[ParsedRow]:
+    """
+    Разбирает строки одним парсером. Для каждой строки возвращает пользователя
+    (или None) и номер комнаты после строки. Выполняется в пуле, поэтому без логов.
+    """
+    parser = UserParser(sheet_name)
+    parsed: list[ParsedRow] = []
+    for offset, data in enumerate(rows):
+        user = parser.parse_user_row(IndexedRow(start_index + offset, data))
+        parsed.append((user, parser.last_room))
+    return parsed
+
+
+class ParseEngine:
+    """
+    Разбор листа без долгих блокировок event loop.
+
+    Номер комнаты наследуется строками от заголовка комнаты (строки c номером в ROOM),
+    поэтому лист режется на чанки только по таким заголовкам: разбор каждого чанка
+    не зависит от предыдущих. Чанки разбираются в пуле процессов или потоков,
+    результаты склеиваются по порядку.
+
+    Отпечатки строк и число изменившихся строк считаются в потоке. Если разбор
+    изменившихся строк по измеренной стоимости строки укладывается в stall_budget_ms,
+    они разбираются без пула, иначе весь лист разбирается в пуле. Применение
+    к синхронизации проходит по всем строкам листа, поэтому на месте оно выполняется
+    только для листа, целиком укладывающегося в бюджет, в остальных случаях в потоке.
+    """
+
+    def __init__(
+        self,
+        *,
+        stall_budget_ms: float = 50,
+        chunk_rows: int = 5000,
+        workers: int = 2,
+        executor: ParseExecutor = "process",
+    ):
+        self._stall_budget_sec = stall_budget_ms / 1000
+        self._chunk_rows = max(chunk_rows, 1)
+        self._workers = max(workers, 1)
+        self._executor_kind: ParseExecutor = executor
+        self._executor: Executor | None = None
+        self.row_cost_sec = 10e-6
+
+    @staticmethod
+    def split_chunks(rows: Rows, chunk_rows: int) -> list[tuple[int, Rows]]:
+        """Делит строки на чанки (смещение, строки) не короче chunk_rows по заголовкам комнат."""
+        chunks: list[tuple[int, Rows]] = []
+        start = 0
+        room_index = UserRowSection.ROOM.index
+        for offset in range(chunk_rows, len(rows)):
+            row = rows[offset]
+            if offset - start >= chunk_rows and row and row[room_index].isdigit():
+                chunks.append((start, rows[start:offset]))
+                start = offset
+        chunks.append((start, rows[start:]))
+        return chunks
+
+    def fits_budget(self, rows_count: int) -> bool:
+        return rows_count * self.row_cost_sec <= self._stall_budget_sec
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self._executor_kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self._workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self._workers, thread_name_prefix="sheet-parser"
+                )
+        return self._executor
+
+    async def parse(self, rows: Rows, start_index: RowIndex, sheet_name: str) -> list[ParsedRow]:
+        loop = get_running_loop()
+        executor = self._get_executor()
+        chunks = self.split_chunks(rows, self._chunk_rows)
+        results = await gather(
+            *(
+                loop.run_in_executor(executor, parse_rows, chunk, start_index + offset, sheet_name)
+                for offset, chunk in chunks
+            )
+        )
+        parsed: list[ParsedRow] = []
+        for result in results:
+            parsed.extend(result)
+        return parsed
+
+    async def apply(self, sync: SheetSync, rows: Rows) -> SyncResult:
+        """Применяет строки к синхронизации, при необходимости разобрав их в пуле."""
+        cold = sync.is_cold
+        fingerprints, changed = await to_thread(sync.diff, rows)
+        if self.fits_budget(changed):
+            started = perf_counter()
+            if self.fits_budget(len(rows)):
+                result = sync.apply(rows, fingerprints=fingerprints)
+            else:
+                result = await to_thread(sync.apply, rows, None, fingerprints)
+            if cold and rows:
+                self.row_cost_sec = (perf_counter() - started) / len(rows)
+            return result
+
+        started = perf_counter()
+        parsed = await self.parse(rows, sync.start_index, sync.sheet_name)
+        logger.debug(
+            "Лист {} ({} строк, изменено {}) разобран в пуле за {:.3f} с.",
+            sync.sheet_name,
+            len(rows),
+            changed,
+            perf_counter() - started,
+        )
+        return await to_thread(sync.apply, rows, parsed, fingerprints)
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
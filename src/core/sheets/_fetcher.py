@@ -0,0 +1,120 @@
+from typing import TYPE_CHECKING, Literal
+
+from ._models import USER_ROW_WIDTH, DatabaseRowSection, Rows, UserRowSection
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    from integration.google_sheets import GoogleSheetsApiClient
+
+FetchMode = Literal["block", "rows"]
+
+
+class SheetFetcher:
+    """
+    Загрузка строк листа базы.
+
+    Режим "block" читает лист несколькими крупными диапазонами одним запросом batchGet,
+    режим "rows" - отдельным диапазоном A{i}:N{i} на каждую строку.
+    Если переданы sections, в режиме "block" запрашиваются только эти колонки
+    (соседние колонки объединяются в один диапазон, данные идут по столбцам),
+    остальные ячейки строки остаются пустыми.
+    Результат всегда приводится к одному виду: по строке на каждый индекс
+    от start_index, каждая строка дополнена пустыми ячейками до USER_ROW_WIDTH.
+    """
+
+    full_row = (UserRowSection.ROOM, UserRowSection.IN_TG_CONVERSATION)
+
+    def __init__(
+        self,
+        api: GoogleSheetsApiClient,
+        sheet_name: str,
+        start_index: int,
+        end_index: int,
+        *,
+        mode: FetchMode = "block",
+        chunk_rows: int = 500,
+        sections: Iterable[DatabaseRowSection] | None = None,
+    ):
+        self._api = api
+        self.sheet_name = sheet_name
+        self.start_index = start_index
+        self.end_index = end_index
+        self.mode: FetchMode = mode
+        self.chunk_rows = max(chunk_rows, 1)
+        self.column_groups = self._group_sections(sections) if sections else None
+
+    @staticmethod
+    def _group_sections(
+        sections: Iterable[DatabaseRowSection],
+    ) -> list[tuple[DatabaseRowSection, DatabaseRowSection]]:
+        """Объединяет соседние колонки в группы (первая, последняя)."""
+        groups: list[tuple[DatabaseRowSection, DatabaseRowSection]] = []
+        for section in sorted(set(sections)):
+            if groups and groups[-1][1].index + 1 == section.index:
+                groups[-1] = (groups[-1][0], section)
+            else:
+                groups.append((section, section))
+        return groups
+
+    def _range(
+        self, start: int, end: int, columns: tuple[DatabaseRowSection, DatabaseRowSection]
+    ) -> str:
+        first, last = columns
+        return f"{self.sheet_name}!{first.letter}{start}:{last.letter}{end}"
+
+    def _chunks(self) -> list[tuple[int, int]]:
+        return [
+            (start, min(start + self.chunk_rows - 1, self.end_index))
+            for start in range(self.start_index, self.end_index + 1, self.chunk_rows)
+        ]
+
+    def ranges(self) -> list[str]:
+        if self.mode == "rows":
+            return [
+                self._range(i, i, self.full_row)
+                for i in range(self.start_index, self.end_index + 1)
+            ]
+        groups = self.column_groups or [self.full_row]
+        return [
+            self._range(start, end, columns) for start, end in self._chunks() for columns in groups
+        ]
+
+    @staticmethod
+    def normalize_rows(rows: Rows) -> Rows:
+        """Убирает пустые строки в конце и дополняет строки до полной ширины."""
+        last = len(rows)
+        while last and not rows[last - 1]:
+            last -= 1
+        return [row + [""] * (USER_ROW_WIDTH - len(row)) if row else [] for row in rows[:last]]
+
+    def _assemble_columns(self, length: int, blocks: list[Rows]) -> Rows:
+        """Собирает строки чанка из блоков, полученных по столбцам для каждой группы колонок."""
+        rows = [[""] * USER_ROW_WIDTH for _ in range(length)]
+        for (first, _), columns in zip(self.column_groups, blocks, strict=True):
+            for offset, column in enumerate(columns):
+                index = first.index + offset
+                for row, value in zip(rows, column, strict=False):
+                    row[index] = value
+        return [row if any(row) else [] for row in rows]
+
+    async def fetch(self) -> Rows:
+        if self.mode == "rows":
+            rows = await self._api.batch_get_values(self.ranges())
+            return self.normalize_rows(rows)
+
+        chunks = self._chunks()
+        rows: Rows = []
+        if self.column_groups is None:
+            blocks = await self._api.batch_get_blocks(self.ranges())
+            for (start, end), block in zip(chunks, blocks, strict=True):
+                rows.extend(block)
+                rows.extend([] for _ in range(end - start + 1 - len(block)))
+            return self.normalize_rows(rows)
+
+        blocks = await self._api.batch_get_blocks(self.ranges(), major_dimension="COLUMNS")
+        groups_count = len(self.column_groups)
+        for number, (start, end) in enumerate(chunks):
+            chunk_blocks = blocks[number * groups_count : (number + 1) * groups_count]
+            rows.extend(self._assemble_columns(end - start + 1, chunk_blocks))
+        return self.normalize_rows(rows)
@@ -1,105 +1,334 @@
-from asyncio import sleep
+from asyncio import Semaphore, gather, to_thread
+from contextlib import suppress
+from datetime import datetime
+from functools import partial
+from itertools import chain
 from json import dumps, loads
-from time import time
-from typing import TYPE_CHECKING
+from time import perf_counter, time
+from typing import TYPE_CHECKING, NamedTuple
 
 from loguru import logger
 
-from integration.google_sheets import GoogleSheetsApiClient
+from integration.google_sheets import DiscoveryCache, GoogleSheetsApiClient
+from utils import SingleFlight
 
-from ._models import User, UserRowSection
+from ._engine import ParseEngine
+from ._fetcher import SheetFetcher
+from ._models import Rows, User, UserRowSection
 from ._parser import UserParser
+from ._scheduler import RefreshScheduler
+from ._snapshot import UsersSnapshot
+from ._store import UserStore
+from ._sync import SheetSync
+from ._writer import SheetWriteBuffer
 
 if TYPE_CHECKING:
+    from collections.abc import Iterable
     from pathlib import Path
 
     from settings import ApplicationSettings
 
 
+class _SheetSource(NamedTuple):
+    name: str
+    fetcher: SheetFetcher
+    sync: SheetSync
+
+
 class GoogleSheetHostel:
     def __init__(self, settings: ApplicationSettings):
         self._api = GoogleSheetsApiClient(
             service_account_path=settings.get_service_account_file_path(),
             spreadsheet_id=settings.SPREADSHEET_ID,
+            read_requests_per_minute=settings.SHEETS_READ_REQUESTS_PER_MINUTE,
+            write_requests_per_minute=settings.SHEETS_WRITE_REQUESTS_PER_MINUTE,
+            max_retries=settings.SHEETS_MAX_RETRIES,
+            discovery_cache=self._create_discovery_cache(settings),
         )
-        self._last_update_db: float = 0
 
-        self._database_sheet_name = settings.DATABASE_SHEET_NAME
-        self._database_start_range = settings.DATABASE_SHEET_START_RANGE
-        self._database_end_range = settings.DATABASE_SHEET_END_RANGE
+        sections = UserParser.required_sections if settings.DATABASE_FETCH_PROJECTION else None
+        self._sources = [
+            _SheetSource(
+                name=sheet_name,
+                fetcher=SheetFetcher(
+                    self._api,
+                    sheet_name=sheet_name,
+                    start_index=settings.DATABASE_SHEET_START_RANGE,
+                    end_index=settings.DATABASE_SHEET_END_RANGE,
+                    mode=settings.DATABASE_FETCH_MODE,
+                    chunk_rows=settings.DATABASE_FETCH_CHUNK_ROWS,
+                    sections=sections,
+                ),
+                sync=SheetSync(
+                    start_index=settings.DATABASE_SHEET_START_RANGE,
+                    sheet_name=sheet_name,
+                    trace_every=settings.DATABASE_PARSE_TRACE_EVERY,
+                ),
+            )
+            for sheet_name in settings.get_database_sheet_names()
+        ]
+        self._fetch_semaphore = Semaphore(max(settings.DATABASE_FETCH_CONCURRENCY, 1))
+        self._parse_engine = ParseEngine(
+            stall_budget_ms=settings.DATABASE_PARSE_STALL_BUDGET_MS,
+            chunk_rows=settings.DATABASE_PARSE_CHUNK_ROWS,
+            workers=settings.DATABASE_PARSE_WORKERS,
+            executor=settings.DATABASE_PARSE_EXECUTOR,
+        )
 
         self._mock_database_file_path: Path | None = settings.get_mock_database_path()
 
-        self.users: list[User] = []
+        snapshot_path = settings.get_snapshot_path()
+        self._snapshot = UsersSnapshot(snapshot_path) if snapshot_path else None
+        self._snapshot_saved = False
+        self._store_synced = False
+        self._snapshot_max_age_sec = settings.DATABASE_SNAPSHOT_MAX_AGE_SEC
+        self._snapshot_updated_at: float | None = None
+
+        self.store = UserStore()
+
+        probe = self._api.get_spreadsheet_version
+        if not settings.DATABASE_CHANGE_PROBE or self._mock_database_file_path:
+            probe = None
+        self._scheduler = RefreshScheduler(
+            self._refresh,
+            probe,
+            period_sec=settings.DATABASE_REFRESH_PERIOD_SEC,
+            jitter_sec=settings.DATABASE_REFRESH_JITTER_SEC,
+            max_staleness_sec=settings.DATABASE_MAX_STALENESS_SEC,
+        )
+        self._default_max_age_sec = settings.DATABASE_COMMAND_MAX_AGE_SEC
+        self._update_flight = SingleFlight()
+        self.refresh_timings: dict[str, float] = {}
+        self._generation = 0
+        self._flight_generation = 0
+        self._writer = SheetWriteBuffer(
+            self._api,
+            max_pending=settings.SHEETS_WRITE_MAX_PENDING,
+            flush_interval_sec=settings.SHEETS_WRITE_FLUSH_INTERVAL_SEC,
+        )
+
+    @staticmethod
+    def _create_discovery_cache(settings: ApplicationSettings) -> DiscoveryCache | None:
+        path = settings.get_discovery_cache_path()
+        if path is None:
+            return None
+        return DiscoveryCache(path, ttl_sec=settings.SHEETS_DISCOVERY_CACHE_TTL_SEC)
 
-    async def update_database(self):
+    @property
+    def users(self) -> list[User]:
+        return self.store.users
 
+    def _load_mock_rows(self) -> dict[str, Rows]:
+        logger.warning("Загрузка базы из mock файла {}.", self._mock_database_file_path)
+        with self._mock_database_file_path.open(encoding="utf-8") as file:
+            data = loads(file.read())
+        if isinstance(data, list):
+            data = {self._sources[0].name: data}
+        return {
+            source.name: source.fetcher.normalize_rows(data.get(source.name, []))
+            for source in self._sources
+        }
+
+    async def _fetch_source(self, source: _SheetSource) -> Rows:
+        async with self._fetch_semaphore:
+            return await source.fetcher.fetch()
+
+    async def _load_rows(self) -> dict[str, Rows]:
         if self._mock_database_file_path and self._mock_database_file_path.exists():
-            logger.warning("Загрузка базы из mock файла {}.", self._mock_database_file_path)
-            with self._mock_database_file_path.open(encoding="utf-8") as file:
-                rows = loads(file.read())
+            return self._load_mock_rows()
 
-            self.users = UserParser.parse_database(
-                rows=rows, start_index=self._database_start_range
-            )
-        else:
-            logger.debug("Обновление базы данных.")
-            ranges = [
-                f"{self._database_sheet_name}!A{i}:N{i}"
-                for i in range(self._database_start_range, self._database_end_range + 1)
-            ]
-            rows = await self._api.batch_get_values(ranges)
-            if self._mock_database_file_path:
-                logger.debug(
-                    "Запись базы данных в mock файл {}", self._mock_database_file_path.name
-                )
-                with self._mock_database_file_path.open(mode="w", encoding="utf-8") as file:
-                    file.write(dumps(rows, indent=4, ensure_ascii=False))
-            self.users = UserParser.parse_database(
-                rows=rows, start_index=self._database_start_range
+        logger.debug("Обновление базы данных.")
+        results = await gather(*(self._fetch_source(source) for source in self._sources))
+        rows = {
+            source.name: sheet_rows
+            for source, sheet_rows in zip(self._sources, results, strict=True)
+        }
+        if self._mock_database_file_path:
+            logger.debug("Запись базы данных в mock файл {}", self._mock_database_file_path.name)
+            with self._mock_database_file_path.open(mode="w", encoding="utf-8") as file:
+                file.write(dumps(rows, indent=4, ensure_ascii=False))
+        return rows
+
+    async def _apply_rows(self, rows: dict[str, Rows]) -> None:
+        changed = False
+        for source in self._sources:
+            result = await self._parse_engine.apply(source.sync, rows[source.name])
+            if not result:
+                continue
+            changed = True
+            logger.info(
+                "Лист {} обновлен: добавлено {}, удалено {}, изменено {} (разобрано строк: {}).",
+                source.name,
+                len(result.added),
+                len(result.removed),
+                len(result.changed),
+                result.parsed_rows,
             )
-        self._last_update_db = time()
+        if changed or not self._store_synced:
+            # Индексы строятся в потоке и подменяются одним присваиванием.
+            users = chain.from_iterable(source.sync.users for source in self._sources)
+            await to_thread(self.store.rebuild, users)
+            self._store_synced = True
+        if self._snapshot and (changed or not self._snapshot_saved):
+            try:
+                await to_thread(self._snapshot.save, self.store.users)
+            except Exception:
+                # Снимок только ускоряет старт, обновленная база в памяти остается в силе.
+                logger.exception("Снимок базы не сохранен.")
+            else:
+                self._snapshot_saved = True
+
+    async def _update_database(self, revision: str | None = None) -> None:
+        if not self._api.connected:
+            await self._api.connect()
+        if revision is None:
+            revision = await self._scheduler.get_revision()
+        started = perf_counter()
+        rows = await self._load_rows()
+        fetched = perf_counter()
+        await self._apply_rows(rows)
+        self._scheduler.mark_refreshed(revision)
+        self.refresh_timings = {"fetch": fetched - started, "parse": perf_counter() - fetched}
+
+    async def update_database(
+        self, max_age_sec: float | None = None, *, revision: str | None = None
+    ) -> None:
+        """
+        Загружает и применяет лист. Одновременные вызовы разделяют одну загрузку,
+        но к загрузке, начатой до последнего invalidate(), вызов не присоединяется.
+        Если задан max_age_sec и данные подтверждены не раньше этого срока, загрузки не будет.
+        revision - уже снятая ревизия таблицы, без нее ревизия снимается перед загрузкой.
+        """
+        if max_age_sec is not None and self._scheduler.age <= max_age_sec:
+            return
+        update = partial(self._update_database, revision)
+        generation = self._generation
+        while True:
+            if not self._update_flight.in_flight:
+                self._flight_generation = self._generation
+            if self._flight_generation >= generation:
+                await self._update_flight.do(update)
+                return
+            # Загрузка начата до invalidate(): результат устарел, ждем и загружаем заново.
+            with suppress(Exception):
+                await self._update_flight.do(update)
+
+    async def _refresh(self, revision: str | None) -> None:
+        await self.update_database(revision=revision)
+
+    @property
+    def snapshot_usable(self) -> bool:
+        """База взята из снимка, лист еще не загружался, и снимок не старше допустимого."""
+        return (
+            self._snapshot_updated_at is not None
+            and not self._scheduler.checked_at
+            and time() - self._snapshot_updated_at <= self._snapshot_max_age_sec
+        )
+
+    async def ensure_fresh(
+        self, max_age_sec: float | None = None, *, accept_snapshot: bool = False
+    ) -> None:
+        """
+        Обновляет базу, только если актуальность данных не подтверждалась дольше max_age_sec.
+        При accept_snapshot команды только для чтения отвечают по свежему снимку,
+        не дожидаясь первой загрузки листа.
+        """
+        if accept_snapshot and self.snapshot_usable:
+            return
+        if max_age_sec is None:
+            max_age_sec = self._default_max_age_sec
+        await self._scheduler.ensure_fresh(max_age_sec)
+
+    def invalidate(self) -> None:
+        self._generation += 1
+        self._scheduler.invalidate()
+
+    def load_snapshot(self) -> bool:
+        if not self._snapshot:
+            return False
+        snapshot = self._snapshot.load()
+        if snapshot is None:
+            return False
+        self.store.rebuild(snapshot.users)
+        self._snapshot_updated_at = snapshot.updated_at
+        logger.info(
+            "База загружена из снимка от {}: {} пользователей.",
+            datetime.fromtimestamp(snapshot.updated_at).astimezone().isoformat(timespec="seconds"),
+            len(snapshot.users),
+        )
+        return True
 
     def get_user_by_vk_id(self, user_id: int) -> User | None:
-        for user in self.users:
-            if user.vk_id == user_id:
-                return user
-        return None
-
-    def get_all_vk_ids(self) -> list[str]:
-        links = []
-        for user in self.users:
-            if not user.vk_id:
-                continue
-            links.append(user.vk_id)
-        return links
+        return self.store.get_by_vk_id(user_id)
 
-    async def write_statuses_in_vk_conversation(self, data: list[tuple[User, bool]]):
-        ranges = []
-        values = []
+    def get_all_vk_ids(self) -> frozenset[int]:
+        return self.store.vk_ids
+
+    async def write_statuses_in_vk_conversation(
+        self, data: list[tuple[User, bool]], *, wait: bool = True
+    ):
+        """Ставит статусы в очередь записи. При wait=True дожидается записи в таблицу."""
         for user, status in data:
-            ranges.append(
-                f"{self._database_sheet_name}!{UserRowSection.IN_VK_CONVERSATION.letter}{user.row_index}"
+            self._writer.write(
+                user.sheet,
+                UserRowSection.IN_VK_CONVERSATION,
+                user.row_index,
+                str(status).upper(),
             )
-            values.append([str(status).upper()])
-        await self._api.batch_update_values(ranges, values)
+            user.is_in_vk_conversation = status
+        if wait:
+            await self._writer.flush()
+
+    def set_vk_conversation_status(self, vk_id: int, status: bool) -> bool:
+        """Отложенно обновляет статус нахождения пользователя в беседе, если он изменился."""
+        user = self.store.get_by_vk_id(vk_id)
+        if user is None or user.is_in_vk_conversation == status:
+            return False
+        self._writer.write(
+            user.sheet,
+            UserRowSection.IN_VK_CONVERSATION,
+            user.row_index,
+            str(status).upper(),
+        )
+        user.is_in_vk_conversation = status
+        return True
 
-    async def update_vk_statuses(self, user_ids_in_vk_conversation: list[int]) -> int:
+    async def update_vk_statuses(self, user_ids_in_vk_conversation: Iterable[int]) -> int:
+        user_ids_in_vk_conversation = set(user_ids_in_vk_conversation)
         data = []
-        for user in self.users:
+        for user in self.store:
             actual_status = user.vk_id in user_ids_in_vk_conversation
             if actual_status != user.is_in_vk_conversation:
                 data.append((user, actual_status))
         await self.write_statuses_in_vk_conversation(data)
         return len(data)
 
+    async def close(self) -> None:
+        try:
+            await self._writer.flush()
+        finally:
+            self._parse_engine.close()
+            await self._api.close()
+
     async def start(self) -> None:
         logger.info("Запуск сервиса Google таблиц")
-        await self._api.connect()
-        await self.update_database()
-        logger.info("База загружена: {} пользоватлеей", len(self.users))
-        while True:
-            await sleep(1)
-            if time() - self._last_update_db < 60 * 5:
-                continue
+        self.load_snapshot()
+        try:
+            # Первая загрузка идет через общую загрузку, чтобы команды во время запуска
+            # не запускали параллельную загрузку и разбор тех же листов.
             await self.update_database()
+        except Exception:
+            # Планировщик и запись в таблицу работают и без первой загрузки:
+            # база берется из снимка, загрузка повторяется по расписанию.
+            logger.exception("Первичная загрузка базы не выполнена.")
+        else:
+            logger.info(
+                "Время запуска: discovery {:.3f} с, авторизация {:.3f} с, "
+                "загрузка листов {:.3f} с, разбор {:.3f} с.",
+                self._api.connect_timings.get("discovery", 0),
+                self._api.connect_timings.get("auth", 0),
+                self.refresh_timings.get("fetch", 0),
+                self.refresh_timings.get("parse", 0),
+            )
+            logger.info("База загружена: {} пользоватлеей", len(self.users))
+        await gather(self._scheduler.run(), self._writer.run())
@@ -34,16 +34,20 @@ class UserRowSection:
     IN_TG_CONVERSATION = DatabaseRowSection(13, "N")
 
 
-@dataclass(frozen=False, kw_only=True)
+USER_ROW_WIDTH = UserRowSection.IN_TG_CONVERSATION.index + 1
+
+
+@dataclass(frozen=False, kw_only=True, slots=True)
 class User:
     row_index: int
-    room: int
+    room: int | None
     fullname: str
     vk_id: int | None
-    tg_id: str | None
+    tg_id: int | None
     is_in_vk_conversation: bool
     is_in_tg_conversation: bool
     is_normalize: bool = False
+    sheet: str = ""
 
     def __repr__(self):
         formatter_string = "User"
@@ -1,11 +1,28 @@
+from operator import itemgetter
+
 from loguru import logger
 
 from ._models import IndexedRow, RowIndex, Rows, User, UserRowSection
 
+_FULLNAME_PREFIX_CHARS = "0123456789. "
+
 
 class UserParser:
-    def __init__(self):
+    required_sections = (
+        UserRowSection.ROOM,
+        UserRowSection.FULLNAME,
+        UserRowSection.VK_ID,
+        UserRowSection.TG_ID,
+        UserRowSection.IN_VK_CONVERSATION,
+        UserRowSection.IN_TG_CONVERSATION,
+    )
+    _extract = itemgetter(*(section.index for section in required_sections))
+
+    def __init__(self, sheet_name: str = "", *, trace_every: int = 0):
+        """trace_every - писать в лог (уровень TRACE) каждую N-ю строку, 0 - не писать."""
         self.last_room: int | None = None
+        self.sheet_name = sheet_name
+        self.trace_every = trace_every
 
     @staticmethod
     def fmt(index: int, text: str, value: str | int = "") -> str:
@@ -13,58 +30,45 @@ class UserParser:
 
     @staticmethod
     def check_fullname(row: IndexedRow) -> str:
-        fullname = row.data[UserRowSection.FULLNAME.index]
-        while fullname and (fullname[0].isdigit() or fullname[0] in (".", " ")):
-            fullname = fullname[1:]
-        return fullname
+        return row.data[UserRowSection.FULLNAME.index].lstrip(_FULLNAME_PREFIX_CHARS)
 
     def parse_user_row(self, row: IndexedRow) -> User | None:
-        named_arguments = {"row_index": row.index}
-        named_arguments.update(vk_id=None)
-        named_arguments.update(tg_id=None)
-
         if not row.data:
             return None
-        data = row.data
+        room, fullname, vk_id, tg_id, in_vk, in_tg = self._extract(row.data)
 
-        room: str = data[UserRowSection.ROOM.index]
-        if "этаж" in room.lower() or "комната" in room.lower():
-            return None
+        # Любое нечисловое значение комнаты - заголовок этажа, шапка таблицы и т.п.
         if room.isdigit():
             self.last_room = int(room)
         elif room:
             return None
-        named_arguments.update({"room": self.last_room})
 
-        fullname = self.check_fullname(row)
+        fullname = fullname.lstrip(_FULLNAME_PREFIX_CHARS)
         if not fullname:
             return None
-        named_arguments.update({"fullname": fullname})
 
-        vk_id: str = data[UserRowSection.VK_ID.index]
-        logger.debug("vk id: {}", vk_id)
-        if vk_id.isdigit():
-            named_arguments.update({"vk_id": int(data[UserRowSection.VK_ID.index])})
-        tg_id: str = data[UserRowSection.TG_ID.index]
-        if tg_id.isdigit():
-            named_arguments.update({"tg_id": int(data[UserRowSection.TG_ID.index])})
-        is_in_vk_conversation_raw = data[UserRowSection.IN_VK_CONVERSATION.index]
-        if is_in_vk_conversation_raw:
-            named_arguments["is_in_vk_conversation"] = is_in_vk_conversation_raw == "TRUE"
-        is_in_tg_conversation_raw = data[UserRowSection.IN_TG_CONVERSATION.index]
-        if is_in_tg_conversation_raw:
-            named_arguments["is_in_tg_conversation"] = is_in_tg_conversation_raw == "TRUE"
-        return User(**named_arguments)
+        user = User(
+            row_index=row.index,
+            room=self.last_room,
+            fullname=fullname,
+            vk_id=int(vk_id) if vk_id.isdigit() else None,
+            tg_id=int(tg_id) if tg_id.isdigit() else None,
+            is_in_vk_conversation=in_vk == "TRUE",
+            is_in_tg_conversation=in_tg == "TRUE",
+            sheet=self.sheet_name,
+        )
+        if self.trace_every and row.index % self.trace_every == 0:
+            logger.trace("parse row {}: {} -> {}", row.index, row.data, user)
+        return user
 
     @classmethod
-    def parse_database(cls, rows: Rows, start_index: RowIndex = 0) -> list[User]:
+    def parse_database(
+        cls, rows: Rows, start_index: RowIndex = 0, sheet_name: str = ""
+    ) -> list[User]:
+        parser = cls(sheet_name)
         users = []
-        parser = UserParser()
-        for row_index in range(len(rows)):
-            # for row_index in range(0, 20):
-            row = IndexedRow(row_index + start_index, rows[row_index])
-            user = parser.parse_user_row(row)
-            logger.debug("parse row: {}. user: {}", rows[row_index], user)
+        for offset, data in enumerate(rows):
+            user = parser.parse_user_row(IndexedRow(offset + start_index, data))
             if user:
                 users.append(user)
         logger.info("Инициализировано {} пользователей!", len(users))
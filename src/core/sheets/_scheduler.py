@@ -0,0 +1,114 @@
+from asyncio import Event, wait_for
+from contextlib import suppress
+from functools import partial
+from random import uniform
+from time import monotonic
+from typing import TYPE_CHECKING
+
+from loguru import logger
+
+from utils import SingleFlight
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable
+
+
+class RefreshScheduler:
+    """
+    Планировщик обновления базы.
+
+    Раз в period_sec (плюс случайный сдвиг до jitter_sec) выполняет дешевую проверку
+    изменений через probe и загружает лист целиком, только если проверка показала
+    изменение. Независимо от проверки полная загрузка выполняется не реже, чем раз
+    в max_staleness_sec. Если проверка не удалась, плановая загрузка тоже ждет
+    max_staleness_sec вместо повтора каждый период. invalidate() будит планировщик
+    и требует полной загрузки, ensure_fresh() гарантирует вызывающему данные не старше
+    заданного возраста. refresh получает ревизию, снятую проверкой (или None),
+    и после загрузки должен вызвать mark_refreshed.
+    """
+
+    def __init__(
+        self,
+        refresh: Callable[[str | None], Awaitable[None]],
+        probe: Callable[[], Awaitable[str]] | None = None,
+        *,
+        period_sec: float = 60,
+        jitter_sec: float = 0,
+        max_staleness_sec: float = 30 * 60,
+    ):
+        self._refresh = refresh
+        self._probe = probe
+        self._period_sec = period_sec
+        self._jitter_sec = jitter_sec
+        self._max_staleness_sec = max_staleness_sec
+
+        self._wakeup = Event()
+        self._check_flight = SingleFlight()
+        self._invalidated = False
+        self._revision: str | None = None
+        self.refreshed_at: float = 0
+        self.checked_at: float = 0
+
+    @property
+    def age(self) -> float:
+        """Сколько секунд прошло c последней подтвержденной актуальности данных."""
+        return monotonic() - self.checked_at
+
+    def invalidate(self) -> None:
+        self._invalidated = True
+        self._wakeup.set()
+
+    async def get_revision(self) -> str | None:
+        if self._probe is None:
+            return None
+        try:
+            return await self._probe()
+        except Exception as error:
+            logger.warning("Проверка изменений листа не выполнена: {}", error)
+            return None
+
+    async def check(self, *, force: bool = False, required: bool = False) -> bool:
+        """
+        Проверяет изменения и при необходимости обновляет базу. True - была полная загрузка.
+        При required неудачная проверка заменяется полной загрузкой.
+        Одновременные вызовы разделяют одну проверку.
+        """
+        if force:
+            self._invalidated = True
+        return await self._check_flight.do(partial(self._check, required=required))
+
+    async def _check(self, *, required: bool) -> bool:
+        force = self._invalidated
+        self._invalidated = False
+        stale = monotonic() - self.refreshed_at >= self._max_staleness_sec
+
+        revision = await self.get_revision()
+        if not (force or stale) and self._probe is not None:
+            if revision is None and not required:
+                return False
+            if revision is not None and revision == self._revision:
+                self.checked_at = monotonic()
+                return False
+
+        await self._refresh(revision)
+        return True
+
+    async def ensure_fresh(self, max_age_sec: float) -> None:
+        # Проверка, начатая до invalidate(), устарела: тогда нужна еще одна.
+        while self._invalidated or self.age > max_age_sec:
+            await self.check(required=True)
+
+    def mark_refreshed(self, revision: str | None = None) -> None:
+        self._revision = revision
+        self.refreshed_at = self.checked_at = monotonic()
+
+    async def run(self) -> None:
+        while True:
+            timeout = max(self._period_sec + uniform(-self._jitter_sec, self._jitter_sec), 1)
+            with suppress(TimeoutError):
+                await wait_for(self._wakeup.wait(), timeout)
+            self._wakeup.clear()
+            try:
+                await self.check()
+            except Exception:
+                logger.exception("Ошибка обновления базы.")
@@ -0,0 +1,108 @@
+import sqlite3
+from contextlib import closing
+from time import time
+from typing import TYPE_CHECKING, NamedTuple
+
+from ._models import User
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+
+class Snapshot(NamedTuple):
+    users: list[User]
+    updated_at: float
+
+
+class UsersSnapshot:
+    """
+    Локальный снимок разобранных пользователей в SQLite.
+
+    Позволяет при запуске сразу отдать последнюю известную базу, не дожидаясь
+    загрузки и разбора листа. Снимок другой версии формата игнорируется.
+    Снимок пишется во временный файл и заменяет прежний целиком, поэтому прерванная
+    запись не оставляет частичного снимка.
+    """
+
+    version = 2
+
+    _schema = """
+        CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+        CREATE TABLE users (
+            sheet TEXT NOT NULL,
+            row_index INTEGER NOT NULL,
+            room INTEGER,
+            fullname TEXT NOT NULL,
+            vk_id INTEGER,
+            tg_id INTEGER,
+            is_in_vk_conversation INTEGER NOT NULL,
+            is_in_tg_conversation INTEGER NOT NULL
+        );
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path)
+
+    def load(self) -> Snapshot | None:
+        if not self.path.exists():
+            return None
+        try:
+            with closing(self._connect()) as connection:
+                meta = dict(connection.execute("SELECT key, value FROM meta").fetchall())
+                if meta.get("version") != str(self.version):
+                    return None
+                rows = connection.execute(
+                    "SELECT sheet, row_index, room, fullname, vk_id, tg_id, "
+                    "is_in_vk_conversation, is_in_tg_conversation FROM users ORDER BY rowid"
+                ).fetchall()
+        except sqlite3.DatabaseError:
+            return None
+        users = [
+            User(
+                row_index=row_index,
+                room=room,
+                fullname=fullname,
+                vk_id=vk_id,
+                tg_id=tg_id,
+                is_in_vk_conversation=bool(in_vk),
+                is_in_tg_conversation=bool(in_tg),
+                sheet=sheet,
+            )
+            for sheet, row_index, room, fullname, vk_id, tg_id, in_vk, in_tg in rows
+        ]
+        return Snapshot(users=users, updated_at=float(meta.get("updated_at", 0)))
+
+    def save(self, users: list[User]) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.unlink(missing_ok=True)
+        try:
+            with closing(sqlite3.connect(tmp_path)) as connection, connection:
+                connection.executescript(self._schema)
+                connection.executemany(
+                    "INSERT INTO users VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    [
+                        (
+                            user.sheet,
+                            user.row_index,
+                            user.room,
+                            user.fullname,
+                            user.vk_id,
+                            user.tg_id,
+                            user.is_in_vk_conversation,
+                            user.is_in_tg_conversation,
+                        )
+                        for user in users
+                    ],
+                )
+                connection.executemany(
+                    "INSERT INTO meta VALUES (?, ?)",
+                    [("version", str(self.version)), ("updated_at", str(time()))],
+                )
+            tmp_path.replace(self.path)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
@@ -0,0 +1,97 @@
+from typing import TYPE_CHECKING, NamedTuple
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
+
+    from ._models import RowIndex, User
+
+
+class _Indexes(NamedTuple):
+    users: list[User]
+    by_vk_id: dict[int, User]
+    by_tg_id: dict[int, User]
+    by_room: dict[int, list[User]]
+    by_row_index: dict[tuple[str, RowIndex], User]
+    by_sheet: dict[str, list[User]]
+    vk_ids: frozenset[int]
+
+
+class UserStore:
+    """
+    Хранилище пользователей базы c хеш-индексами по vk_id, tg_id, комнате, листу
+    и номеру строки. База может состоять из нескольких листов (корпусов), поэтому
+    строка адресуется парой (лист, номер строки).
+
+    Индексы строятся целиком при каждом обновлении базы и подменяются одним присваиванием,
+    поэтому читатели всегда видят согласованный снимок.
+    """
+
+    def __init__(self, users: Iterable[User] = ()):
+        self._indexes = self._build(users)
+
+    @staticmethod
+    def _build(users: Iterable[User]) -> _Indexes:
+        users = list(users)
+        by_vk_id: dict[int, User] = {}
+        by_tg_id: dict[int, User] = {}
+        by_room: dict[int, list[User]] = {}
+        by_row_index: dict[tuple[str, RowIndex], User] = {}
+        by_sheet: dict[str, list[User]] = {}
+        for user in users:
+            if user.vk_id:
+                by_vk_id.setdefault(user.vk_id, user)
+            if user.tg_id:
+                by_tg_id.setdefault(user.tg_id, user)
+            if user.room is not None:
+                by_room.setdefault(user.room, []).append(user)
+            by_row_index[user.sheet, user.row_index] = user
+            by_sheet.setdefault(user.sheet, []).append(user)
+        return _Indexes(
+            users=users,
+            by_vk_id=by_vk_id,
+            by_tg_id=by_tg_id,
+            by_room=by_room,
+            by_row_index=by_row_index,
+            by_sheet=by_sheet,
+            vk_ids=frozenset(by_vk_id),
+        )
+
+    def rebuild(self, users: Iterable[User]) -> None:
+        self._indexes = self._build(users)
+
+    @property
+    def users(self) -> list[User]:
+        return self._indexes.users
+
+    @property
+    def vk_ids(self) -> frozenset[int]:
+        return self._indexes.vk_ids
+
+    def __len__(self) -> int:
+        return len(self._indexes.users)
+
+    def __iter__(self) -> Iterator[User]:
+        return iter(self._indexes.users)
+
+    def get_by_vk_id(self, vk_id: int) -> User | None:
+        return self._indexes.by_vk_id.get(vk_id)
+
+    def get_by_tg_id(self, tg_id: int) -> User | None:
+        return self._indexes.by_tg_id.get(tg_id)
+
+    def get_by_room(self, room: int) -> list[User]:
+        return self._indexes.by_room.get(room, [])
+
+    def get_by_sheet(self, sheet_name: str) -> list[User]:
+        return self._indexes.by_sheet.get(sheet_name, [])
+
+    def get_by_row_index(self, sheet_name: str, row_index: RowIndex) -> User | None:
+        return self._indexes.by_row_index.get((sheet_name, row_index))
+
+    def get_vk_ids_not_in(self, conversation_ids: Iterable[int]) -> frozenset[int]:
+        """vk_id пользователей базы, которых нет среди переданных (например, в беседе)."""
+        return self._indexes.vk_ids.difference(conversation_ids)
+
+    def get_ids_not_in_db(self, conversation_ids: Iterable[int]) -> set[int]:
+        """Переданные id (например, участники беседы), которых нет в базе."""
+        return set(conversation_ids).difference(self._indexes.vk_ids)
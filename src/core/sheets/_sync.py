@@ -0,0 +1,138 @@
+from typing import TYPE_CHECKING, NamedTuple
+
+from ._models import IndexedRow, RowIndex, Rows, User
+from ._parser import UserParser
+
+if TYPE_CHECKING:
+    from ._engine import ParsedRow
+
+
+class SyncResult(NamedTuple):
+    added: list[User]
+    removed: list[User]
+    changed: list[User]
+    parsed_rows: int
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.changed)
+
+
+class _RowState(NamedTuple):
+    fingerprint: int
+    room_in: int | None
+    room_out: int | None
+    user: User | None
+
+
+class SheetSync:
+    """
+    Инкрементальная синхронизация пользователей по листу базы.
+
+    Для каждой строки хранится отпечаток сырых данных и номер комнаты до и после строки.
+    Строка разбирается заново, только если изменилась она сама или комната,
+    унаследованная от предыдущих строк. Поэтому смена номера комнаты перестраивает
+    следующие строки до очередного заголовка комнаты, прочие строки берутся из состояния.
+    """
+
+    def __init__(self, start_index: RowIndex = 0, sheet_name: str = "", *, trace_every: int = 0):
+        self.start_index = start_index
+        self.sheet_name = sheet_name
+        self.trace_every = trace_every
+        self._states: list[_RowState] = []
+        self.users: list[User] = []
+
+    @property
+    def is_cold(self) -> bool:
+        """Состояния нет: следующий apply разберет все строки."""
+        return not self._states
+
+    def reset(self) -> None:
+        self._states = []
+        self.users = []
+
+    @staticmethod
+    def _compare(
+        old_user: User | None,
+        user: User | None,
+        added: list[User],
+        removed: list[User],
+        changed: list[User],
+    ) -> User | None:
+        """Раскладывает результат разбора строки по спискам изменений."""
+        if user is None:
+            if old_user is not None:
+                removed.append(old_user)
+        elif old_user is None:
+            added.append(user)
+        elif user == old_user:
+            return old_user
+        else:
+            changed.append(user)
+        return user
+
+    @staticmethod
+    def fingerprint_rows(rows: Rows) -> list[int]:
+        return [hash(tuple(data)) for data in rows]
+
+    def diff(self, rows: Rows) -> tuple[list[int], int]:
+        """
+        Отпечатки строк и число строк, отпечаток которых не совпал c прежним.
+        Строки, перестраиваемые из-за смены комнаты выше, сюда не входят.
+        Только читает состояние, поэтому может выполняться в потоке.
+        """
+        fingerprints = self.fingerprint_rows(rows)
+        old_states = self._states
+        changed = max(len(fingerprints) - len(old_states), 0)
+        changed += sum(
+            state.fingerprint != fingerprint
+            for state, fingerprint in zip(old_states, fingerprints, strict=False)
+        )
+        return fingerprints, changed
+
+    def apply(
+        self,
+        rows: Rows,
+        parsed: list[ParsedRow] | None = None,
+        fingerprints: list[int] | None = None,
+    ) -> SyncResult:
+        """
+        Применяет строки листа. parsed - заранее разобранные строки (см. ParseEngine),
+        тогда вместо разбора изменившихся строк берется готовый результат.
+        fingerprints - посчитанные заранее отпечатки строк (см. diff).
+        """
+        if fingerprints is None:
+            fingerprints = self.fingerprint_rows(rows)
+        parser = UserParser(self.sheet_name, trace_every=self.trace_every)
+        old_states = self._states
+        states: list[_RowState] = []
+        users: list[User] = []
+        added: list[User] = []
+        removed: list[User] = []
+        changed: list[User] = []
+        parsed_rows = 0
+
+        for offset, (data, fingerprint) in enumerate(zip(rows, fingerprints, strict=True)):
+            room_in = parser.last_room
+            old = old_states[offset] if offset < len(old_states) else None
+
+            if old and old.fingerprint == fingerprint and old.room_in == room_in:
+                parser.last_room = old.room_out
+                state = old
+            else:
+                parsed_rows += 1
+                if parsed is None:
+                    user = parser.parse_user_row(IndexedRow(offset + self.start_index, data))
+                else:
+                    user, parser.last_room = parsed[offset]
+                user = self._compare(old.user if old else None, user, added, removed, changed)
+                state = _RowState(fingerprint, room_in, parser.last_room, user)
+
+            states.append(state)
+            if state.user is not None:
+                users.append(state.user)
+
+        removed.extend(state.user for state in old_states[len(rows) :] if state.user)
+
+        self._states = states
+        self.users = users
+        return SyncResult(added, removed, changed, parsed_rows)
@@ -0,0 +1,87 @@
+from asyncio import Event, Lock, wait_for
+from contextlib import suppress
+from itertools import groupby
+from typing import TYPE_CHECKING
+
+from loguru import logger
+
+if TYPE_CHECKING:
+    from integration.google_sheets import GoogleSheetsApiClient
+
+    from ._models import DatabaseRowSection, RowIndex
+
+CellKey = tuple[str, str, int]
+
+
+class SheetWriteBuffer:
+    """
+    Отложенная запись ячеек листа.
+
+    Записи в одну и ту же ячейку схлопываются (побеждает последняя), соседние строки
+    одной колонки объединяются в один прямоугольный диапазон. Буфер сбрасывается
+    одним batchUpdate при накоплении max_pending ячеек, раз в flush_interval_sec
+    и при остановке. Дождаться записи можно через flush().
+    """
+
+    def __init__(
+        self, api: GoogleSheetsApiClient, *, max_pending: int = 50, flush_interval_sec: float = 10
+    ):
+        self._api = api
+        self._max_pending = max_pending
+        self._flush_interval_sec = flush_interval_sec
+        self._pending: dict[CellKey, str] = {}
+        self._flush_lock = Lock()
+        self._wakeup = Event()
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def write(
+        self, sheet_name: str, section: DatabaseRowSection, row_index: RowIndex, value: str
+    ) -> None:
+        self._pending[(sheet_name, section.letter, row_index)] = value
+        if len(self._pending) >= self._max_pending:
+            self._wakeup.set()
+
+    @staticmethod
+    def build_ranges(cells: dict[CellKey, str]) -> list[tuple[str, list[list[str]]]]:
+        """Группирует ячейки в диапазоны вида 'List!M5:M9' и значения для них по строкам."""
+        ranges = []
+        for (sheet_name, letter), group in groupby(sorted(cells), key=lambda key: key[:2]):
+            keys = list(group)
+            start = previous = keys[0][2]
+            values = [[cells[keys[0]]]]
+            for key in keys[1:]:
+                row_index = key[2]
+                if row_index != previous + 1:
+                    ranges.append((f"{sheet_name}!{letter}{start}:{letter}{previous}", values))
+                    start, values = row_index, []
+                values.append([cells[key]])
+                previous = row_index
+            ranges.append((f"{sheet_name}!{letter}{start}:{letter}{previous}", values))
+        return ranges
+
+    async def flush(self) -> int:
+        """Записывает все накопленные ячейки. Возвращает количество записанных ячеек."""
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+            cells, self._pending = self._pending, {}
+            try:
+                await self._api.batch_update_ranges(self.build_ranges(cells))
+            except BaseException:
+                for key, value in cells.items():
+                    self._pending.setdefault(key, value)
+                raise
+            logger.debug("Записано {} ячеек в таблицу.", len(cells))
+            return len(cells)
+
+    async def run(self) -> None:
+        while True:
+            with suppress(TimeoutError):
+                await wait_for(self._wakeup.wait(), self._flush_interval_sec)
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Ошибка записи изменений в таблицу.")
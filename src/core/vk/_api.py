@@ -1,12 +1,18 @@
-from asyncio import sleep
 from typing import TYPE_CHECKING
 
 from loguru import logger
 
+from ._conversation import Conversation
+from ._deletion import DeletionScheduler
 from ._dialogs_conversation import Dialogs
-from ._utils import get_random_id
+from ._outbound import OutboundPipeline, Priority
+from ._profiles import ProfileResolver
+from ._receipts import ReadReceipts
+from ._utils import get_random_id, pack_messages
 
 if TYPE_CHECKING:
+    from collections.abc import Iterable
+
     from settings import ApplicationSettings
 
     from .base import BotUserLongPool
@@ -16,36 +22,56 @@ dialog = Dialogs()
 
 
 class ConversationAPI:
+    """
+    Общие для всех обслуживаемых бесед ресурсы: очередь исходящих запросов c лимитом,
+    кеш имен, отложенное удаление и отметки o прочтении. Состояние каждой беседы
+    хранится в Conversation, беседы ищутся по peer_id в словаре conversations.
+    """
+
     def __init__(self, settings: ApplicationSettings, bot: BotUserLongPool):
         self._bot: BotUserLongPool = bot
-        self.conversation_id = settings.CONVERSATION_ID
-        self._notification_join_offset = settings.NOTIFICATION_JOIN_OFFSET
-        self._cache_full_names: dict[int, str] = {}
+        self.vk = bot.api
+        self.outbound = OutboundPipeline(
+            bot.api, requests_per_second=settings.VK_REQUESTS_PER_SECOND
+        )
+        self.profiles = ProfileResolver(
+            bot.api,
+            max_size=settings.VK_PROFILE_CACHE_SIZE,
+            ttl_sec=settings.VK_PROFILE_CACHE_TTL_SEC,
+        )
+        self.receipts = ReadReceipts(
+            self.mark_as_read, interval_sec=settings.VK_READ_RECEIPTS_INTERVAL_SEC
+        )
+        self.deletions = DeletionScheduler(
+            self.delete_messages,
+            settings.get_deletion_queue_path(),
+            window_sec=settings.VK_DELETION_WINDOW_SEC,
+        )
+        self.conversations: dict[int, Conversation] = {
+            peer_id: Conversation(self, peer_id, settings)
+            for peer_id in settings.get_conversation_ids()
+        }
+        self.group_id: int = 0
 
-        self.conversation_admins: set[int] = set()
-        self.conversation_users: set[int] = set()
-        self.conversation_bots: set[int] = set()
+    @property
+    def primary(self) -> Conversation:
+        """Первая из настроенных бесед, c ней сверяются статусы в таблице."""
+        return next(iter(self.conversations.values()))
 
-        self._notification_join_offset = 20
-        self._notification_join_target_offset: int = 0
-        self.group_id: int = 0
+    def get_conversation(self, peer_id: int) -> Conversation | None:
+        return self.conversations.get(peer_id)
 
     async def get_full_name_for_user(self, user_id: int) -> str | None:
         if user_id < 0:
             logger.debug("Попытка получения полного имени для группы невозможно!")
             return None
-        if user_id in self._cache_full_names:
-            return self._cache_full_names.get(user_id)
-        user = (await self._bot.api.users.get([user_id]))[0]
-        full_name = f"{user.first_name} {user.last_name}"
-        logger.debug("Полное имя для пользователя с id: {} загружено и помещено в cache.", user_id)
-        self._cache_full_names.update({user_id: full_name})
-        return full_name
-
-    async def send_message_to_conversation(self, text: str) -> int:
-        data = {"peer_id": self.conversation_id, "message": text, "random_id": get_random_id()}
-        logger.debug("Отправка сообщения в беседу. Сообщение: {}", text)
-        return await self._bot.api.messages.send(**data)
+        return await self.profiles.get(user_id)
+
+    async def send_message(
+        self, peer_id: int, text: str, priority: Priority = Priority.MESSAGE
+    ) -> int:
+        data = {"peer_id": peer_id, "message": text, "random_id": get_random_id()}
+        return await self.outbound.request("messages.send", data, priority)
 
     async def send_reply_message(self, text: str, peer_id: int, reply_message_id: int) -> int:
         data = {
@@ -60,85 +86,28 @@ class ConversationAPI:
             peer_id,
             text,
         )
-        return await self._bot.api.messages.send(**data)
-
-    async def send_reply_message_conversation(self, text: str, reply_message_id: int) -> int:
-        return await self.send_reply_message(text, self.conversation_id, reply_message_id)
+        return await self.outbound.request("messages.send", data, Priority.REPLY)
 
     async def send_private_message(self, text: str, peer_id):
-        data = {"peer_id": peer_id, "message": text, "random_id": get_random_id()}
         logger.debug("Отправка сообщения пользователю с id {}. Сообщение: {}", peer_id, text)
-        return await self._bot.api.messages.send(**data)
+        return await self.send_message(peer_id, text, Priority.REPLY)
 
-    async def delete_message(self, message_id):
+    async def delete_messages(self, message_ids: list[int]) -> bool:
         # todo Добавить возможность удаления сообщения администраторов!
-        request_data = {"message_ids": message_id, "delete_for_all": 1}
+        request_data = {"message_ids": ",".join(map(str, message_ids)), "delete_for_all": 1}
         try:
-            await self._bot.api.request("messages.delete", request_data)
-            logger.debug("Сообщение с номером id: {}, было успешно удаленно.", message_id)
-            if self._notification_join_target_offset > 0:
-                self._notification_join_target_offset -= 1
-        except BaseException as error:
+            await self.outbound.request("messages.delete", request_data, Priority.MODERATION)
+        except Exception as error:
             logger.error(
-                "Сообщение с id: {} не может быть удаленно. Причина: {}.", message_id, error
-            )
-            return
-
-    async def kick_user_conversation(self, user_id: int) -> bool:
-        if self.is_admin(user_id):
-            logger.warning(
-                "Пользователь с id: {} не может быть исключен из беседы, так как он админ!", user_id
+                "Сообщения с id: {} не могут быть удалены. Причина: {}.", message_ids, error
             )
             return False
-        chat_id = self.conversation_id - 2000000000
-        result = await self._bot.api.messages.remove_chat_user(member_id=user_id, chat_id=chat_id)
-        if result == 1:
-            logger.debug("Пользователь с id: {} исключен. Результат: {}", user_id, result)
-            return True
-        return None
-
-    async def send_join_user_conversation_notification(self, user_id: int) -> None:
-        full_name = await self.get_full_name_for_user(user_id)
-        text = dialog.transit.join.format(user_id=user_id, full_name=full_name)
-        if self._notification_join_target_offset > self._notification_join_offset:
-            text += "\n\n" + dialog.transit.extended_join
-            self._notification_join_target_offset = 0
-        await self.send_message_to_conversation(text)
-
-    async def send_left_user_conversation_notification(self, user_id: int) -> None:
-        full_name = await self.get_full_name_for_user(user_id)
-        text = dialog.transit.left.format(user_id=user_id, full_name=full_name)
-        await self.send_message_to_conversation(text)
-
-    async def read_all_messages_from_conversation(self):
-        await self._bot.api.messages.mark_as_read(
-            peer_id=self.conversation_id, mark_conversation_as_read=True
-        )
+        logger.debug("Сообщения с id: {} были успешно удалены.", message_ids)
+        return True
 
-    def increment_messages_counter(self):
-        self._notification_join_target_offset += 1
-
-    async def load_conversation(self) -> None:
-        response = await self._bot.api.messages.get_conversation_members(
-            peer_id=self.conversation_id, group_id=self.group_id
-        )
-        bots = set()
-        admins = set()
-        users = set()
-        for member in response.items:
-            if member.member_id < 0:
-                bots.add(member.member_id)
-            elif member.is_admin:
-                admins.add(member.member_id)
-            else:
-                users.add(member.member_id)
-        self.conversation_bots = bots
-        self.conversation_users = users
-        self.conversation_admins = admins
-
-        for profile in response.profiles:
-            full_name = f"{profile.first_name} {profile.last_name}"
-            self._cache_full_names.update({profile.id: full_name})
+    async def mark_as_read(self, peer_id: int, message_id: int) -> None:
+        data = {"peer_id": peer_id, "start_message_id": message_id, "mark_conversation_as_read": 1}
+        await self.outbound.request("messages.markAsRead", data, Priority.NOTIFICATION)
 
     async def load_group(self) -> None:
         response_group = await self._bot.api.groups.get_by_id()
@@ -150,41 +119,28 @@ class ConversationAPI:
         logger.info(
             "Данные группы {} ({}) успешно загружены.", response_group.name, response_group.id
         )
-        response_conversation = await self._bot.api.messages.get_conversations_by_id(
-            peer_ids=[self.conversation_id]
-        )
-        await self.load_conversation()
-
-        chat_title = ""
-        settings = response_conversation.items[0].chat_settings
-        if settings and settings.title:
-            chat_title = settings.title
-        logger.info(
-            "Беседа {} ({}) загружена! Количество админов: {}, ботов: {}, участников: {}.",
-            chat_title,
-            self.conversation_id,
-            len(self.conversation_admins),
-            len(self.conversation_bots),
-            len(self.conversation_users),
+        response_conversations = await self._bot.api.messages.get_conversations_by_id(
+            peer_ids=list(self.conversations)
         )
+        for item in response_conversations.items:
+            conversation = self.conversations.get(item.peer.id)
+            if conversation is not None and item.chat_settings and item.chat_settings.title:
+                conversation.title = item.chat_settings.title
+
+        for conversation in self.conversations.values():
+            await conversation.load_members()
+            logger.info(
+                "Беседа {} ({}) загружена! Количество админов: {}, ботов: {}, участников: {}.",
+                conversation.title,
+                conversation.peer_id,
+                len(conversation.admins),
+                len(conversation.bots),
+                len(conversation.users),
+            )
 
-    async def send_message_and_sleep_and_delete(self, message_text: str, sleep_sec: int):
-        message_id = await self.send_message_to_conversation(message_text)
-        await sleep(sleep_sec)
-        await self.delete_message(message_id)
-
-    async def send_reply_message_conversation_and_sleep_and_delete(
-        self, message_text: str, reply_message_id: int, sleep_sec: int
-    ):
-        message_id = await self.send_reply_message_conversation(message_text, reply_message_id)
-        await sleep(sleep_sec)
-        await self.delete_message(message_id)
-
-    def is_admin(self, user_id: int):
-        return user_id in self.conversation_admins
-
-    def get_user_ids(self) -> list[int]:
-        return [*self.conversation_admins, *self.conversation_users]
+    def is_admin(self, user_id: int) -> bool:
+        """Админ хотя бы одной из бесед."""
+        return any(conversation.is_admin(user_id) for conversation in self.conversations.values())
 
     async def get_named_link(
         self,
@@ -192,19 +148,21 @@ class ConversationAPI:
     ) -> str:
         return f"@id{user_id} ({await self.get_full_name_for_user(user_id)})"
 
-    async def format_named_links_from_user_ids(self, list_ids: list[int]) -> str:
-        msg = ""
-        for user_id in list_ids:
-            link = await self.get_named_link(user_id)
-            msg += "\n" + link
-        return msg
+    async def get_named_link_lines(self, list_ids: Iterable[int]) -> list[str]:
+        """Строки "\n@id (имя)" для pack_messages, имена разрешаются одним запросом."""
+        list_ids = list(list_ids)
+        names = await self.profiles.resolve(list_ids)
+        return [f"\n@id{user_id} ({names.get(user_id)})" for user_id in list_ids]
+
+    async def format_named_links_from_user_ids(self, list_ids: Iterable[int]) -> str:
+        return "".join(await self.get_named_link_lines(list_ids))
 
-    async def send_named_links_from_user_ids(self, peer_id: int, list_ids: list[int]):
+    async def send_named_links_from_user_ids(self, peer_id: int, list_ids: Iterable[int]):
         if not list_ids:
             return await self.send_private_message(
                 peer_id=peer_id, text=dialog.commands.not_user_are_request
             )
-        msg = await self.format_named_links_from_user_ids(list_ids)
-        if msg:
-            return await self.send_private_message(peer_id=peer_id, text=msg)
+        lines = await self.get_named_link_lines(list_ids)
+        for text in pack_messages([("", lines)]):
+            await self.send_private_message(peer_id=peer_id, text=text)
         return None
@@ -0,0 +1,180 @@
+from dataclasses import dataclass, field
+from enum import Flag, IntEnum, auto
+from time import perf_counter
+from typing import TYPE_CHECKING, Any
+
+from loguru import logger
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable, Iterable
+
+
+class CommandScope(Flag):
+    CONVERSATION = auto()
+    PRIVATE = auto()
+    ANY = CONVERSATION | PRIVATE
+
+
+class Role(IntEnum):
+    USER = 0
+    ADMIN = 1
+
+
+class CommandError(Exception):
+    """Ошибка вызова команды, текст которой можно показать пользователю."""
+
+
+def positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        msg = f"Ожидается число больше нуля: {value}"
+        raise ValueError(msg)
+    return number
+
+
+@dataclass(frozen=True, kw_only=True, slots=True)
+class Argument:
+    name: str
+    converter: Callable[[str], Any] = str
+    required: bool = False
+    default: Any = None
+    description: str = ""
+
+    def usage(self) -> str:
+        return f"<{self.name}>" if self.required else f"[{self.name}]"
+
+
+@dataclass(frozen=True, kw_only=True, slots=True)
+class Command:
+    name: str
+    handler: Callable[..., Awaitable[object]]
+    description: str
+    aliases: tuple[str, ...] = ()
+    scope: CommandScope = CommandScope.PRIVATE
+    role: Role = Role.ADMIN
+    arguments: tuple[Argument, ...] = ()
+    hidden: bool = False
+
+    def usage(self, prefix: str) -> str:
+        return " ".join(
+            [f"{prefix}{self.name}", *(argument.usage() for argument in self.arguments)]
+        )
+
+    def parse_arguments(self, tokens: list[str], prefix: str = "/") -> dict[str, Any]:
+        if len(tokens) > len(self.arguments):
+            msg = f"Слишком много аргументов. Использование: {self.usage(prefix)}"
+            raise CommandError(msg)
+        arguments = {}
+        for index, argument in enumerate(self.arguments):
+            if index >= len(tokens):
+                if argument.required:
+                    msg = f"Не указан аргумент {argument.name}. Использование: {self.usage(prefix)}"
+                    raise CommandError(msg)
+                arguments[argument.name] = argument.default
+                continue
+            try:
+                arguments[argument.name] = argument.converter(tokens[index])
+            except ValueError:
+                msg = f"Неверное значение аргумента {argument.name}: {tokens[index]}"
+                raise CommandError(msg) from None
+        return arguments
+
+
+@dataclass(kw_only=True)
+class CommandStats:
+    calls: int = 0
+    errors: int = 0
+    total_sec: float = 0
+    max_sec: float = 0
+
+    @property
+    def avg_sec(self) -> float:
+        return self.total_sec / self.calls if self.calls else 0.0
+
+
+@dataclass(frozen=True, slots=True)
+class ResolvedCommand:
+    command: Command
+    tokens: list[str] = field(default_factory=list)
+
+
+class CommandRegistry:
+    """
+    Таблица команд бота.
+
+    Для каждой области (беседа, личные сообщения) имя и псевдонимы команды
+    раскладываются в отдельный словарь, поэтому поиск команды - один поиск в словаре
+    после разбиения текста на слова. Справка строится по этой же таблице,
+    время выполнения и ошибки каждой команды учитываются в stats.
+    """
+
+    def __init__(self, prefix: str = "/"):
+        self.prefix = prefix
+        self._commands: list[Command] = []
+        self._lookup: dict[CommandScope, dict[str, Command]] = {
+            CommandScope.CONVERSATION: {},
+            CommandScope.PRIVATE: {},
+        }
+        self.stats: dict[str, CommandStats] = {}
+
+    def add(self, command: Command) -> None:
+        for scope, lookup in self._lookup.items():
+            if not command.scope & scope:
+                continue
+            for name in (command.name, *command.aliases):
+                if name in lookup:
+                    msg = f"Команда {self.prefix}{name} уже зарегистрирована."
+                    raise ValueError(msg)
+                lookup[name] = command
+        self._commands.append(command)
+        self.stats[command.name] = CommandStats()
+
+    def extend(self, commands: Iterable[Command]) -> None:
+        for command in commands:
+            self.add(command)
+
+    def resolve(self, text: str, scope: CommandScope) -> ResolvedCommand | None:
+        tokens = text.split()
+        if not tokens or not tokens[0].startswith(self.prefix):
+            return None
+        command = self._lookup[scope].get(tokens[0][len(self.prefix) :].lower())
+        if command is None:
+            return None
+        return ResolvedCommand(command, tokens[1:])
+
+    async def execute(self, resolved: ResolvedCommand, *args: Any) -> None:
+        """Разбирает аргументы и выполняет команду. CommandError пробрасывается вызывающему."""
+        command = resolved.command
+        stats = self.stats[command.name]
+        stats.calls += 1
+        started = perf_counter()
+        try:
+            await command.handler(*args, **command.parse_arguments(resolved.tokens, self.prefix))
+        except Exception:
+            stats.errors += 1
+            raise
+        finally:
+            elapsed = perf_counter() - started
+            stats.total_sec += elapsed
+            stats.max_sec = max(stats.max_sec, elapsed)
+            logger.debug("Команда {}{} выполнена за {:.3f} с.", self.prefix, command.name, elapsed)
+
+    def help(self, scope: CommandScope, role: Role, header: str) -> str:
+        lines = [header]
+        for command in self._commands:
+            if command.hidden or not command.scope & scope or command.role > role:
+                continue
+            line = f"{command.usage(self.prefix)} - {command.description}"
+            if command.aliases:
+                aliases = ", ".join(f"{self.prefix}{alias}" for alias in command.aliases)
+                line += f" (также {aliases})"
+            lines.append(line)
+        return "\n".join(lines)
+
+    def format_stats(self) -> str:
+        return "\n".join(
+            f"{self.prefix}{name}: вызовов {stats.calls}, ошибок {stats.errors}, "
+            f"среднее {stats.avg_sec * 1000:.0f} мс, максимум {stats.max_sec * 1000:.0f} мс"
+            for name, stats in self.stats.items()
+            if stats.calls
+        )
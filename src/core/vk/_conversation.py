@@ -0,0 +1,209 @@
+from typing import TYPE_CHECKING
+
+from loguru import logger
+
+from ._dialogs_conversation import Dialogs
+from ._flood import FloodControl
+from ._outbound import Priority
+from ._transit import TransitDigest
+from ._utils import MAX_MESSAGE_LENGTH, PEER_ID_OFFSET, pack_messages
+
+if TYPE_CHECKING:
+    from settings import ApplicationSettings
+
+    from ._api import ConversationAPI
+
+
+dialog = Dialogs()
+
+
+class Conversation:
+    """
+    Состояние одной беседы: участники, счетчик сообщений для расширенного приветствия,
+    уведомления o входе и выходе, ограничение флуда и блокировка сообщений.
+
+    Очередь запросов, кеш имен, отложенное удаление и отметки o прочтении общие
+    для всех бесед и берутся из ConversationAPI.
+    """
+
+    members_page_size = 200
+
+    def __init__(self, api: ConversationAPI, peer_id: int, settings: ApplicationSettings):
+        self._api = api
+        self.peer_id = peer_id
+        self.title = ""
+        self._notification_join_offset = settings.NOTIFICATION_JOIN_OFFSET
+        self._notification_join_target_offset: int = 0
+        self.transit = TransitDigest(
+            self.send_transit_notification,
+            self.send_transit_digest,
+            window_sec=settings.VK_TRANSIT_DIGEST_WINDOW_SEC,
+        )
+        self.flood = FloodControl(
+            window_sec=settings.VK_FLOOD_WINDOW_SEC,
+            warn_after=settings.VK_FLOOD_WARN_AFTER,
+            delete_after=settings.VK_FLOOD_DELETE_AFTER,
+            mute_after=settings.VK_FLOOD_MUTE_AFTER,
+            mute_sec=settings.VK_FLOOD_MUTE_SEC,
+            max_authors=settings.VK_FLOOD_MAX_AUTHORS,
+        )
+        self.global_mute = False
+        self.kicked_list: set[int] = set()
+
+        self.admins: set[int] = set()
+        self.users: set[int] = set()
+        self.bots: set[int] = set()
+
+    @property
+    def chat_id(self) -> int:
+        return self.peer_id - PEER_ID_OFFSET
+
+    async def send_message(self, text: str, priority: Priority = Priority.MESSAGE) -> int:
+        logger.debug("Отправка сообщения в беседу {}. Сообщение: {}", self.peer_id, text)
+        return await self._api.send_message(self.peer_id, text, priority)
+
+    async def send_reply_message(self, text: str, reply_message_id: int) -> int:
+        return await self._api.send_reply_message(text, self.peer_id, reply_message_id)
+
+    async def send_message_and_schedule_delete(self, message_text: str, delete_after_sec: int):
+        message_id = await self.send_message(message_text)
+        self._api.deletions.schedule(message_id, delete_after_sec)
+
+    async def send_reply_message_and_schedule_delete(
+        self, message_text: str, reply_message_id: int, delete_after_sec: int
+    ):
+        message_id = await self.send_reply_message(message_text, reply_message_id)
+        self._api.deletions.schedule(message_id, delete_after_sec)
+
+    async def delete_message(self, message_id: int) -> bool:
+        deleted = await self._api.delete_messages([message_id])
+        if deleted:
+            self._notification_join_target_offset = max(
+                self._notification_join_target_offset - 1, 0
+            )
+        return deleted
+
+    async def kick_user(self, user_id: int) -> bool:
+        if self.is_admin(user_id):
+            logger.warning(
+                "Пользователь с id: {} не может быть исключен из беседы {}, так как он админ!",
+                user_id,
+                self.peer_id,
+            )
+            return False
+        result = await self._api.outbound.request(
+            "messages.removeChatUser",
+            {"chat_id": self.chat_id, "member_id": user_id},
+            Priority.MODERATION,
+        )
+        if result == 1:
+            logger.debug("Пользователь с id: {} исключен. Результат: {}", user_id, result)
+            return True
+        return None
+
+    def _append_extended_join(self, text: str) -> str:
+        if self._notification_join_target_offset > self._notification_join_offset:
+            text += "\n\n" + dialog.transit.extended_join
+            self._notification_join_target_offset = 0
+        return text
+
+    async def send_join_user_notification(self, user_id: int) -> None:
+        full_name = await self._api.get_full_name_for_user(user_id)
+        text = dialog.transit.join.format(user_id=user_id, full_name=full_name)
+        await self.send_message(self._append_extended_join(text), Priority.NOTIFICATION)
+
+    async def send_left_user_notification(self, user_id: int) -> None:
+        full_name = await self._api.get_full_name_for_user(user_id)
+        text = dialog.transit.left.format(user_id=user_id, full_name=full_name)
+        await self.send_message(text, Priority.NOTIFICATION)
+
+    async def send_transit_notification(self, user_id: int, joined: bool) -> None:
+        if joined:
+            await self.send_join_user_notification(user_id)
+        else:
+            await self.send_left_user_notification(user_id)
+
+    async def send_transit_digest(self, joined: list[int], left: list[int]) -> None:
+        names = await self._api.profiles.resolve([*joined, *left])
+        sections = []
+        if joined:
+            lines = [f"\n@id{user_id} ({names.get(user_id)})" for user_id in joined]
+            sections.append((dialog.transit.join_digest.format(links=""), lines))
+        if left:
+            lines = [f"\n@id{user_id} ({names.get(user_id)})" for user_id in left]
+            sections.append((dialog.transit.left_digest.format(links=""), lines))
+        messages = pack_messages(sections)
+        if joined:
+            extended = self._append_extended_join(messages[-1])
+            if len(extended) <= MAX_MESSAGE_LENGTH:
+                messages[-1] = extended
+            elif extended != messages[-1]:
+                messages.append(dialog.transit.extended_join)
+        for text in messages:
+            await self.send_message(text, Priority.NOTIFICATION)
+
+    async def read_all_messages(self):
+        await self._api.vk.messages.mark_as_read(
+            peer_id=self.peer_id, mark_conversation_as_read=True
+        )
+
+    def increment_messages_counter(self):
+        self._notification_join_target_offset += 1
+
+    async def load_members(self) -> None:
+        """Полная сверка участников беседы постранично по members_page_size."""
+        bots = set()
+        admins = set()
+        users = set()
+        offset = 0
+        while True:
+            response = await self._api.vk.messages.get_conversation_members(
+                peer_id=self.peer_id,
+                group_id=self._api.group_id,
+                offset=offset,
+                count=self.members_page_size,
+            )
+            for member in response.items:
+                if member.member_id < 0:
+                    bots.add(member.member_id)
+                elif member.is_admin:
+                    admins.add(member.member_id)
+                else:
+                    users.add(member.member_id)
+            for profile in response.profiles or ():
+                self._api.profiles.put(profile.id, f"{profile.first_name} {profile.last_name}")
+            offset += len(response.items)
+            if not response.items or offset >= response.count:
+                break
+
+        drift = len(users ^ self.users) + len(admins ^ self.admins)
+        if drift and (self.users or self.admins):
+            logger.info("Сверка участников беседы {}: расхождений {}.", self.peer_id, drift)
+        self.bots = bots
+        self.users = users
+        self.admins = admins
+
+    def apply_member_joined(self, member_id: int) -> None:
+        if member_id < 0:
+            self.bots.add(member_id)
+        elif member_id not in self.admins:
+            self.users.add(member_id)
+
+    def apply_member_left(self, member_id: int) -> None:
+        self.bots.discard(member_id)
+        self.users.discard(member_id)
+        self.admins.discard(member_id)
+
+    def apply_admin_changed(self, member_id: int, *, is_admin: bool) -> None:
+        if is_admin:
+            self.users.discard(member_id)
+            self.admins.add(member_id)
+        elif member_id in self.admins:
+            self.admins.discard(member_id)
+            self.users.add(member_id)
+
+    def is_admin(self, user_id: int) -> bool:
+        return user_id in self.admins
+
+    def get_user_ids(self) -> set[int]:
+        return self.admins | self.users
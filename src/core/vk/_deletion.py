@@ -0,0 +1,102 @@
+from asyncio import Event, wait_for
+from contextlib import suppress
+from heapq import heapify, heappop, heappush
+from json import JSONDecodeError, dumps, loads
+from time import time
+from typing import TYPE_CHECKING
+
+from loguru import logger
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable
+    from pathlib import Path
+
+
+class DeletionScheduler:
+    """
+    Отложенное удаление сообщений.
+
+    schedule() только добавляет сообщение в кучу по времени удаления и сразу возвращает
+    управление. run() ждет ближайший срок и удаляет одним вызовом все сообщения,
+    срок которых наступает в пределах window_sec (не более max_batch id за вызов).
+    Очередь хранится в JSON файле, поэтому после перезапуска просроченные сообщения
+    удаляются сразу, остальные - в свой срок.
+    """
+
+    format_version = 1
+    max_batch = 100
+
+    def __init__(
+        self,
+        delete: Callable[[list[int]], Awaitable[None]],
+        path: Path | None = None,
+        *,
+        window_sec: float = 1,
+    ):
+        self._delete = delete
+        self._path = path
+        self._window_sec = window_sec
+        self._heap: list[tuple[float, int]] = self._load()
+        self._wakeup = Event()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def _load(self) -> list[tuple[float, int]]:
+        if self._path is None:
+            return []
+        try:
+            with self._path.open(encoding="utf-8") as file:
+                data = loads(file.read())
+        except FileNotFoundError:
+            return []
+        except (OSError, JSONDecodeError) as error:
+            logger.warning("Очередь удаления {} повреждена: {}", self._path.name, error)
+            return []
+        if data.get("format_version") != self.format_version:
+            return []
+        heap = [(float(due_at), int(message_id)) for due_at, message_id in data["pending"]]
+        heapify(heap)
+        if heap:
+            logger.info("Загружено {} сообщений, ожидающих удаления.", len(heap))
+        return heap
+
+    def _save(self) -> None:
+        if self._path is None:
+            return
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        data = {"format_version": self.format_version, "pending": self._heap}
+        tmp_path = self._path.with_suffix(".tmp")
+        with tmp_path.open(mode="w", encoding="utf-8") as file:
+            file.write(dumps(data))
+        tmp_path.replace(self._path)
+
+    def schedule(self, message_id: int, delay_sec: float, *, persist: bool = True) -> None:
+        """persist=False - не переписывать файл очереди (для коротких задержек)."""
+        heappush(self._heap, (time() + delay_sec, message_id))
+        if persist:
+            self._save()
+        self._wakeup.set()
+
+    def _pop_due(self) -> list[int]:
+        deadline = time() + self._window_sec
+        message_ids = []
+        while self._heap and self._heap[0][0] <= deadline and len(message_ids) < self.max_batch:
+            message_ids.append(heappop(self._heap)[1])
+        return message_ids
+
+    async def run(self) -> None:
+        while True:
+            timeout = self._heap[0][0] - time() if self._heap else None
+            if timeout is None or timeout > 0:
+                with suppress(TimeoutError):
+                    await wait_for(self._wakeup.wait(), timeout)
+                self._wakeup.clear()
+            message_ids = self._pop_due()
+            if not message_ids:
+                continue
+            try:
+                await self._delete(message_ids)
+            except Exception:
+                logger.exception("Ошибка удаления сообщений {}.", message_ids)
+            self._save()
@@ -6,11 +6,19 @@ class Permissions:
         "Они проверят информацию и вышлют сообщение от себя с соответствующим тегом!"
     )
     private_cmd_denied = "Команда не обнаружена или у вас нет доступа к ней!"
+    conversation_denied = "У вас нет прав администратора в беседе {peer_id}."
+    flood_warning = (
+        "@id{user_id} ({full_name}), слишком много сообщений подряд! "
+        "Если продолжить, сообщения начнут удаляться."
+    )
+    flood_mute = "@id{user_id} ({full_name}) не может писать в беседу {minutes} мин. за флуд."
 
 
 class Transits:
     left = "@id{user_id} ({full_name}) покидает беседу!"
     join = "@id{user_id} ({full_name}) присоединяется к беседе!"
+    join_digest = "К беседе присоединяются:{links}"
+    left_digest = "Беседу покидают:{links}"
 
     extended_join = (
         "Рекомендуется отключить уведомления в беседе, дабы вас не беспокоили неважные сообщения.\n\n"
@@ -29,25 +37,15 @@ class Commands:
     count_updated_statuses = "Обновлено {count} статусов пользователей."
     count_updated_links = "Обновлено {count} ссылок пользователей."
 
-    help = (
-        "Команды бота:\n"
-        "/help - получение списка доступных команд.\n"
-        "/global_mute - переключение состояния блокировки сообщений в беседе.\n"
-        "/send_join_extended_message - отправка расширенного сообщения при вступлении в беседу.\n"
-    )
+    help = "Команды бота:"
+    no_command_stats = "Команды еще не вызывались."
 
     start = (
         "Бот находится в рабочем состоянии, но на данный момент у него нет функционала для пользователей. \n\n"
         "Если у вас есть какие-либо вопросы, можете написать Артуру, старосте общежития: @arthur_koba"
     )
 
-    private_help = (
-        "Команды бота: \n"
-        "/update_statuses - обновить статусы в базе о нахождении пользователей в беседе.\n"
-        "/show_need_kick - показать пользователей которых нужно исключить.\n"
-        "/show_need_invite - показать пользователей которых нужно пригласить.\n"
-        "/kick_users_from_conversation - исключить пользователей из беседы, которых нет в базе.\n"
-    )
+    unknown_conversation = "Бот не обслуживает беседу {peer_id}."
 
     not_reply_message = "Команда может быть использована только на пересланное сообщение!"
 
@@ -0,0 +1,146 @@
+from array import array
+from collections import OrderedDict
+from enum import IntEnum
+from time import monotonic
+
+from loguru import logger
+
+
+class FloodAction(IntEnum):
+    NONE = 0
+    WARN = 1
+    DELETE = 2
+    MUTE = 3
+
+
+class _AuthorWindow:
+    """Кольцевой буфер времени последних сообщений автора."""
+
+    __slots__ = ("head", "muted_until", "times", "total", "warned_at")
+
+    def __init__(self, capacity: int):
+        self.times = array("d", bytes(8 * capacity))
+        self.head = 0
+        self.total = 0
+        self.warned_at = float("-inf")
+        self.muted_until = 0.0
+
+    def record(self, now: float) -> None:
+        self.times[self.head] = now
+        self.head = (self.head + 1) % len(self.times)
+        self.total += 1
+
+    @property
+    def last_at(self) -> float:
+        return self.times[(self.head - 1) % len(self.times)] if self.total else float("-inf")
+
+    def is_muted(self, now: float) -> bool:
+        return self.muted_until > now
+
+    def reached(self, count: int, now: float, window_sec: float) -> bool:
+        """Было ли не меньше count сообщений за последние window_sec."""
+        if count <= 0 or self.total < count:
+            return False
+        return now - self.times[(self.head - count) % len(self.times)] <= window_sec
+
+
+class FloodControl:
+    """
+    Ограничение частоты сообщений каждого автора в скользящем окне.
+
+    Для автора хранится кольцевой буфер времени последних mute_after сообщений,
+    поэтому проверка "N сообщений за window_sec" - одно сравнение c N-м c конца
+    элементом, то есть O(1) на сообщение. Авторы хранятся в LRU: при каждой проверке
+    c головы LRU забывается не больше sweep_limit авторов, которые молчат дольше
+    window_sec и не заблокированы. Заблокированные авторы не забываются до конца
+    блокировки. Если авторов все же больше max_authors, забывается давнее всех писавший
+    незаблокированный автор, a если заблокированы все - давнее всех писавший
+    заблокированный, и блокировка этого автора теряется.
+
+    Пороги: c warn_after сообщений в окне - одно предупреждение, c delete_after -
+    удаление сообщений, c mute_after - запрет писать на mute_sec (все сообщения
+    в это время удаляются).
+    """
+
+    def __init__(
+        self,
+        *,
+        window_sec: float = 10,
+        warn_after: int = 5,
+        delete_after: int = 8,
+        mute_after: int = 12,
+        mute_sec: float = 300,
+        max_authors: int = 1000,
+    ):
+        self._window_sec = window_sec
+        self._warn_after = warn_after
+        self._delete_after = delete_after
+        self._mute_after = mute_after
+        self._mute_sec = mute_sec
+        self._max_authors = max_authors
+        self._capacity = max(warn_after, delete_after, mute_after, 1)
+        self.sweep_limit = 8
+        self._authors: OrderedDict[int, _AuthorWindow] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._authors)
+
+    def _sweep(self, now: float) -> None:
+        """Забывает молчащих дольше window_sec авторов c головы LRU."""
+        for _ in range(min(self.sweep_limit, len(self._authors))):
+            author_id, window = next(iter(self._authors.items()))
+            if now - window.last_at <= self._window_sec:
+                break
+            if window.is_muted(now):
+                self._authors.move_to_end(author_id)
+            else:
+                del self._authors[author_id]
+
+    def _evict(self, now: float) -> None:
+        """Освобождает место для нового автора при достижении max_authors."""
+        author_id = next(
+            (author_id for author_id, window in self._authors.items() if not window.is_muted(now)),
+            None,
+        )
+        if author_id is None:
+            author_id = next(iter(self._authors))
+            logger.warning("Блокировка за флуд пользователя {} снята: нет места.", author_id)
+        del self._authors[author_id]
+
+    def _get_window(self, author_id: int, now: float) -> _AuthorWindow:
+        window = self._authors.get(author_id)
+        if window is None:
+            if len(self._authors) >= self._max_authors:
+                self._evict(now)
+            window = self._authors[author_id] = _AuthorWindow(self._capacity)
+        else:
+            self._authors.move_to_end(author_id)
+        return window
+
+    def check(self, author_id: int, now: float | None = None) -> FloodAction:
+        """Учитывает сообщение автора и возвращает действие модерации."""
+        if now is None:
+            now = monotonic()
+        self._sweep(now)
+        window = self._get_window(author_id, now)
+        window.record(now)
+
+        if window.is_muted(now):
+            return FloodAction.DELETE
+        if window.reached(self._mute_after, now, self._window_sec):
+            window.muted_until = now + self._mute_sec
+            return FloodAction.MUTE
+        if window.reached(self._delete_after, now, self._window_sec):
+            return FloodAction.DELETE
+        if (
+            window.reached(self._warn_after, now, self._window_sec)
+            and now - window.warned_at > self._window_sec
+        ):
+            window.warned_at = now
+            return FloodAction.WARN
+        return FloodAction.NONE
+
+    def unmute(self, author_id: int) -> None:
+        window = self._authors.get(author_id)
+        if window is not None:
+            window.muted_until = 0.0
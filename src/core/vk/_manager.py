@@ -1,20 +1,38 @@
-from asyncio import create_task, sleep
+from asyncio import Event, create_task, gather, sleep, wait_for
+from contextlib import suppress
 from typing import TYPE_CHECKING
 
 from loguru import logger
 from vkbottle_types.events.enums import UserEventType
 
 from ._api import ConversationAPI
+from ._commands import (
+    Argument,
+    Command,
+    CommandError,
+    CommandRegistry,
+    CommandScope,
+    ResolvedCommand,
+    Role,
+    positive_int,
+)
 from ._dialogs_conversation import Dialogs
+from ._flood import FloodAction
+from ._moderation import BulkKick
+from ._utils import to_peer_id
 from .base import BotUserLongPool
 
 if TYPE_CHECKING:
+    from collections.abc import Iterable
+
     from vkbottle.tools.mini_types.user.message import MessageMin
     from vkbottle_types.events.user_events import RawUserEvent
 
     from core.sheets import GoogleSheetHostel
     from settings import ApplicationSettings
 
+    from ._conversation import Conversation
+
 
 dialog = Dialogs()
 
@@ -27,207 +45,449 @@ class VKManager:
         settings: ApplicationSettings,
         hostel_sheets: GoogleSheetHostel,
     ):
-
-        self.conversation_id = settings.CONVERSATION_ID
-
         self.bot = BotUserLongPool(
-            token=settings.GROUP_ACCESS_TOKEN, conversation_id=self.conversation_id
+            token=settings.GROUP_ACCESS_TOKEN, conversation_ids=settings.get_conversation_ids()
         )
         self._api = ConversationAPI(settings=settings, bot=self.bot)
 
-        self._loop_checker_sleep_sec = 30
-        self._global_mute = False
+        self._members_reconcile_sec = settings.VK_MEMBERS_RECONCILE_SEC
+        self._members_reconcile_min_interval_sec = settings.VK_MEMBERS_RECONCILE_MIN_INTERVAL_SEC
+        self._members_reconcile = Event()
+        self._shutdown_timeout_sec = 5
+        self._flood_mute_sec = settings.VK_FLOOD_MUTE_SEC
+        self._flood_delete_delay_sec = settings.VK_FLOOD_DELETE_DELAY_SEC
+        self._kick_concurrency = settings.VK_KICK_CONCURRENCY
         self._sheets = hostel_sheets
 
         self.bot.on.raw_event(UserEventType.CHAT_INFO_EDIT)(self._process_user_transit)
         self.bot.on.conversation_message()(self._process_conversation_message)
         self.bot.on.private_message()(self._process_private_command)
-        self.kicked_list = set()
+        self.bot.on_events_gap(self.request_members_reconcile)
+        self._commands = CommandRegistry()
+        self._register_commands()
 
     async def _process_conversation_message(self, message: MessageMin):
         author_id = message.from_id
-        if message.peer_id != self.conversation_id or (
-            author_id < 0 and author_id == -self._api.group_id
-        ):
+        conversation = self._api.get_conversation(message.peer_id)
+        if conversation is None or (author_id < 0 and author_id == -self._api.group_id):
+            return None
+        if not conversation.is_admin(author_id) and await self._check_flood(conversation, message):
             return None
-        fullname = await self._api.get_full_name_for_user(message.from_id)
-        logger.debug("New message: {} -> {}", fullname, message.text)
-        self._api.increment_messages_counter()
-        await self.bot.api.messages.mark_as_read(
-            peer_id=self.conversation_id, mark_conversation_as_read=True
-        )
 
         full_name = await self._api.get_full_name_for_user(message.from_id)
+        logger.debug("New message: {} -> {}", full_name, message.text)
+        conversation.increment_messages_counter()
+        self._api.receipts.mark(message.peer_id, message.id)
 
-        if self._global_mute and not self._api.is_admin(author_id):
+        if conversation.global_mute and not conversation.is_admin(author_id):
             logger.debug("{} ({}) отправил сообщение: {}", full_name, message.from_id, message.text)
-            await self._api.delete_message(message_id=message.id)
+            await conversation.delete_message(message_id=message.id)
             return None
         if message.text.startswith("/"):
-            return await self._process_conversation_command(author_id, message)
-        if ("@all " in message.text or message.text == "@all") and not self._api.is_admin(
+            return await self._process_conversation_command(conversation, author_id, message)
+        if ("@all " in message.text or message.text == "@all") and not conversation.is_admin(
             author_id
         ):
-            await self._api.send_reply_message_conversation_and_sleep_and_delete(
+            await conversation.send_reply_message_and_schedule_delete(
                 dialog.permission.tag_all_denied, message.id, 15
             )
-            await self._api.delete_message(message.id)
+            await conversation.delete_message(message.id)
         return None
 
-    async def _process_conversation_command(self, author_id: int, message: MessageMin):
-        cmd = message.text
-        if not self._api.is_admin(author_id):
+    async def _check_flood(self, conversation: Conversation, message: MessageMin) -> bool:
+        """Применяет ограничение флуда. True - сообщение удаляется и дальше не обрабатывается."""
+        action = conversation.flood.check(message.from_id)
+        if action == FloodAction.NONE:
+            return False
+        if action == FloodAction.WARN:
+            full_name = await self._api.get_full_name_for_user(message.from_id)
+            await conversation.send_reply_message_and_schedule_delete(
+                dialog.permission.flood_warning.format(
+                    user_id=message.from_id, full_name=full_name
+                ),
+                message.id,
+                15,
+            )
+            return False
+
+        # Удаления во время всплеска копятся и уходят одним messages.delete.
+        self._api.deletions.schedule(message.id, self._flood_delete_delay_sec, persist=False)
+        if action == FloodAction.MUTE:
+            logger.info("Пользователь с id: {} заблокирован за флуд.", message.from_id)
+            full_name = await self._api.get_full_name_for_user(message.from_id)
+            await conversation.send_message_and_schedule_delete(
+                dialog.permission.flood_mute.format(
+                    user_id=message.from_id,
+                    full_name=full_name,
+                    minutes=self._flood_mute_sec // 60,
+                ),
+                30,
+            )
+        return True
+
+    def _register_commands(self) -> None:
+        limit = Argument(
+            name="limit", converter=positive_int, description="сколько пользователей показать"
+        )
+        peer = Argument(
+            name="peer_id", converter=to_peer_id, description="беседа (peer_id или номер беседы)"
+        )
+        self._commands.extend(
+            [
+                Command(
+                    name="help",
+                    handler=self._command_help,
+                    description="получение списка доступных команд.",
+                    scope=CommandScope.ANY,
+                ),
+                Command(
+                    name="global_mute",
+                    handler=self._command_global_mute,
+                    description="переключение состояния блокировки сообщений в беседе.",
+                    scope=CommandScope.CONVERSATION,
+                ),
+                Command(
+                    name="send_join_extended_message",
+                    handler=self._command_send_join_extended_message,
+                    description="отправка расширенного сообщения при вступлении в беседу.",
+                    scope=CommandScope.CONVERSATION,
+                ),
+                Command(
+                    name="del",
+                    handler=self._command_delete,
+                    description="удаление сообщения, на которое дан ответ.",
+                    scope=CommandScope.CONVERSATION,
+                ),
+                Command(
+                    name="start",
+                    handler=self._command_start,
+                    description="проверка работы бота.",
+                    role=Role.USER,
+                    hidden=True,
+                ),
+                Command(
+                    name="update_statuses",
+                    handler=self._update_statuses_db_in_conversation,
+                    description="обновить статусы в базе о нахождении пользователей в беседе.",
+                ),
+                Command(
+                    name="show_need_kick",
+                    handler=self._show_users_which_are_need_kick,
+                    description="показать пользователей которых нужно исключить.",
+                    arguments=(limit, peer),
+                ),
+                Command(
+                    name="show_need_invite",
+                    handler=self._show_users_which_are_need_invite,
+                    description="показать пользователей которых нужно пригласить.",
+                    arguments=(limit, peer),
+                ),
+                Command(
+                    name="kick_users_from_conversation",
+                    handler=self._kick_users_which_are_not_in_db,
+                    description="исключить пользователей из беседы, которых нет в базе.",
+                    arguments=(peer,),
+                ),
+                Command(
+                    name="kick_users_dry_run",
+                    handler=self._command_kick_dry_run,
+                    description="показать, кто будет исключен, без исключения.",
+                    arguments=(peer,),
+                ),
+                Command(
+                    name="command_stats",
+                    handler=self._command_stats,
+                    description="статистика выполнения команд.",
+                ),
+            ]
+        )
+
+    async def _reply(self, message: MessageMin, text: str, delete_after_sec: int = 10) -> None:
+        conversation = self._api.get_conversation(message.peer_id)
+        if conversation is not None:
+            await conversation.send_reply_message_and_schedule_delete(
+                text, message.id, delete_after_sec
+            )
+        else:
+            await self._api.send_private_message(peer_id=message.peer_id, text=text)
+
+    def _get_target_conversation(
+        self, message: MessageMin, peer_id: int | None = None
+    ) -> Conversation:
+        """
+        Беседа, к которой относится команда: беседа, в которой она отправлена, иначе
+        указанная в аргументе peer_id или основная. Автор команды должен быть админом
+        этой беседы.
+        """
+        conversation = self._api.get_conversation(message.peer_id)
+        if conversation is None:
+            conversation = (
+                self._api.primary if peer_id is None else self._api.get_conversation(peer_id)
+            )
+        if conversation is None:
+            raise CommandError(dialog.commands.unknown_conversation.format(peer_id=peer_id))
+        if not conversation.is_admin(message.from_id):
+            raise CommandError(
+                dialog.permission.conversation_denied.format(peer_id=conversation.peer_id)
+            )
+        return conversation
+
+    async def _execute_command(self, message: MessageMin, resolved: ResolvedCommand) -> None:
+        try:
+            await self._commands.execute(resolved, message)
+        except CommandError as error:
+            await self._reply(message, str(error))
+
+    async def _process_conversation_command(
+        self, conversation: Conversation, author_id: int, message: MessageMin
+    ):
+        resolved = self._commands.resolve(message.text, CommandScope.CONVERSATION)
+        role = Role.ADMIN if conversation.is_admin(author_id) else Role.USER
+        if role < (resolved.command.role if resolved else Role.ADMIN):
             full_name = await self._api.get_full_name_for_user(user_id=message.from_id)
             message_text = dialog.permission.command_denied.format(
                 user_id=message.from_id, full_name=full_name
             )
-            await self._api.send_reply_message_conversation_and_sleep_and_delete(
-                message_text, message.id, 10
+            await conversation.send_reply_message_and_schedule_delete(message_text, message.id, 10)
+            await conversation.delete_message(message.id)
+        elif resolved is None:
+            await conversation.send_reply_message_and_schedule_delete(
+                dialog.commands.unknown, message.id, 5
             )
-            await self._api.delete_message(message.id)
-        elif cmd == "/help":
-            await self._api.send_message_and_sleep_and_delete(dialog.commands.help, 10)
-        elif cmd == "/global_mute":
-            self._global_mute = not self._global_mute
-            state = dialog.commands.lock if self._global_mute else dialog.commands.unlock
-            message_text = dialog.commands.global_mute.format(state=state)
-            await self._api.send_message_to_conversation(text=message_text)
-        elif cmd == "/send_join_extended_message":
-            await self._api.send_message_to_conversation(text=dialog.transit.extended_join)
-        elif cmd == "/del":
-            if not message.reply_message:
-                return await self._api.send_reply_message_conversation_and_sleep_and_delete(
-                    dialog.commands.not_reply_message, message.id, 10
-                )
-            await self._api.delete_message(message.reply_message.id)
         else:
-            await self._api.send_reply_message_conversation_and_sleep_and_delete(
-                dialog.commands.unknown, message.id, 5
+            await self._execute_command(message, resolved)
+
+    async def _command_help(self, message: MessageMin) -> None:
+        conversation = self._api.get_conversation(message.peer_id)
+        if conversation is not None:
+            text = self._commands.help(CommandScope.CONVERSATION, Role.ADMIN, dialog.commands.help)
+            await conversation.send_message_and_schedule_delete(text, 10)
+        else:
+            text = self._commands.help(CommandScope.PRIVATE, Role.ADMIN, dialog.commands.help)
+            await self._api.send_private_message(peer_id=message.peer_id, text=text)
+
+    async def _command_global_mute(self, message: MessageMin) -> None:
+        conversation = self._get_target_conversation(message)
+        conversation.global_mute = not conversation.global_mute
+        state = dialog.commands.lock if conversation.global_mute else dialog.commands.unlock
+        message_text = dialog.commands.global_mute.format(state=state)
+        await conversation.send_message(text=message_text)
+
+    async def _command_send_join_extended_message(self, message: MessageMin) -> None:
+        conversation = self._get_target_conversation(message)
+        await conversation.send_message(text=dialog.transit.extended_join)
+
+    async def _command_delete(self, message: MessageMin) -> None:
+        conversation = self._get_target_conversation(message)
+        if not message.reply_message:
+            await conversation.send_reply_message_and_schedule_delete(
+                dialog.commands.not_reply_message, message.id, 10
             )
-        return None
+            return
+        await conversation.delete_message(message.reply_message.id)
+
+    async def _command_start(self, message: MessageMin) -> None:
+        await self._api.send_private_message(peer_id=message.peer_id, text=dialog.commands.start)
+
+    async def _command_kick_dry_run(self, message: MessageMin, peer_id: int | None = None) -> None:
+        await self._kick_users_which_are_not_in_db(message, peer_id, dry_run=True)
+
+    async def _command_stats(self, message: MessageMin) -> None:
+        text = self._commands.format_stats() or dialog.commands.no_command_stats
+        await self._api.send_private_message(peer_id=message.peer_id, text=text)
 
     async def _process_user_transit(self, event: RawUserEvent) -> None:
         edit_id = event.object[1]
         user_id = event.object[3]
-        peer_id = event.object[2]
-        if peer_id != self.conversation_id:
+        conversation = self._api.get_conversation(event.object[2])
+        if conversation is None:
             return
+        # Статус в таблице один на пользователя и отражает основную беседу.
+        is_primary = conversation is self._api.primary
         if edit_id == 6:
-            logger.debug("Пользователь с id: {} присоединился к беседе!", user_id)
-            await self._api.send_join_user_conversation_notification(user_id=user_id)
+            logger.debug(
+                "Пользователь с id: {} присоединился к беседе {}!", user_id, conversation.peer_id
+            )
+            conversation.apply_member_joined(user_id)
+            if is_primary:
+                self._sheets.set_vk_conversation_status(user_id, status=True)
+            conversation.transit.add(user_id, joined=True)
         elif edit_id == 7:
-            logger.debug("Пользователь с id: {} вышел из беседы!", user_id)
-            await self._api.send_left_user_conversation_notification(user_id=user_id)
-            if user_id in self.kicked_list:
-                self.kicked_list.remove(user_id)
+            logger.debug("Пользователь с id: {} вышел из беседы {}!", user_id, conversation.peer_id)
+            conversation.apply_member_left(user_id)
+            if is_primary:
+                self._sheets.set_vk_conversation_status(user_id, status=False)
+            conversation.transit.add(user_id, joined=False)
+            if user_id in conversation.kicked_list:
+                conversation.kicked_list.remove(user_id)
             else:
-                await self._api.kick_user_conversation(user_id=user_id)
-                self.kicked_list.add(user_id)
+                await conversation.kick_user(user_id)
+                conversation.kicked_list.add(user_id)
+        elif edit_id == 8:
+            logger.debug(
+                "Пользователь с id: {} исключен из беседы {}!", user_id, conversation.peer_id
+            )
+            conversation.apply_member_left(user_id)
+            # Исключение после выхода (см. edit_id 7) завершено.
+            conversation.kicked_list.discard(user_id)
+        elif edit_id in (3, 9):
+            conversation.apply_admin_changed(user_id, is_admin=edit_id == 3)
 
     async def _process_private_command(self, message: MessageMin):
-        await self.bot.api.messages.mark_as_read(
-            peer_id=message.peer_id, mark_conversation_as_read=True
-        )
-        author_id = message.peer_id
+        self._api.receipts.mark(message.peer_id, message.id)
         if not message.text.startswith("/"):
-            return await self._api.send_private_message(
-                peer_id=message.peer_id, text=dialog.commands.start
-            )
-
-        cmd = message.text
+            return await self._command_start(message)
 
-        if cmd == "/start":
-            return await self._api.send_private_message(
-                peer_id=message.peer_id, text=dialog.commands.start
-            )
-        if not self._api.is_admin(author_id):
+        resolved = self._commands.resolve(message.text, CommandScope.PRIVATE)
+        role = Role.ADMIN if self._api.is_admin(message.peer_id) else Role.USER
+        if resolved is None or role < resolved.command.role:
             return await self._api.send_private_message(
                 peer_id=message.peer_id, text=dialog.permission.private_cmd_denied
             )
-
-        if cmd == "/help":
-            await self._api.send_private_message(
-                peer_id=message.peer_id, text=dialog.commands.private_help
-            )
-        elif cmd == "/show_need_kick":
-            await self._show_users_which_are_need_kick(message)
-        elif cmd == "/show_need_invite":
-            await self._show_users_which_are_need_invite(message)
-        elif cmd == "/kick_users_from_conversation":
-            await self._kick_users_which_are_not_in_db()
-        elif cmd == "/update_statuses":
-            await self._update_statuses_db_in_conversation(message)
-
+        await self._execute_command(message, resolved)
         return None
 
     async def _send_notes(self, message: MessageMin):
-        await self._sheets.update_database()
+        await self._sheets.ensure_fresh()
         msg = ""
         if msg:
             await self._api.send_private_message(peer_id=message.peer_id, text=msg)
 
-    @staticmethod
-    def _get_users_which_are_need_kick(db_ids, conversation_ids: list[int]) -> list[int]:
-        need_kick = []
-        for user_id in conversation_ids:
-            if user_id not in db_ids:
-                need_kick.append(user_id)
-        return need_kick
-
-    async def _get_db_and_conversation_vk_ids(self):
-        await self._sheets.update_database()
-        db_vk_ids = self._sheets.get_all_vk_ids()
-        conversation_ids = self._api.get_user_ids()
-        return db_vk_ids, conversation_ids
-
-    async def _show_users_which_are_need_kick(self, message: MessageMin):
-        db_ids, conversation_ids = await self._get_db_and_conversation_vk_ids()
-        need_kick = self._get_users_which_are_need_kick(db_ids, conversation_ids)
+    def _get_users_which_are_need_kick(self, conversation_ids: Iterable[int]) -> list[int]:
+        return sorted(self._sheets.store.get_ids_not_in_db(conversation_ids))
+
+    def _get_users_which_are_need_invite(self, conversation_ids: Iterable[int]) -> list[int]:
+        return sorted(self._sheets.store.get_vk_ids_not_in(conversation_ids))
+
+    async def _get_conversation_vk_ids(
+        self, conversation: Conversation, *, accept_snapshot: bool = False
+    ) -> set[int]:
+        await self._sheets.ensure_fresh(accept_snapshot=accept_snapshot)
+        return conversation.get_user_ids()
+
+    async def _show_users_which_are_need_kick(
+        self, message: MessageMin, limit: int | None = None, peer_id: int | None = None
+    ):
+        conversation = self._get_target_conversation(message, peer_id)
+        conversation_ids = await self._get_conversation_vk_ids(conversation, accept_snapshot=True)
+        need_kick = self._get_users_which_are_need_kick(conversation_ids)[:limit]
         await self._api.send_named_links_from_user_ids(message.peer_id, need_kick)
 
-    async def _show_users_which_are_need_invite(self, message: MessageMin):
-        db_ids, conversation_ids = await self._get_db_and_conversation_vk_ids()
-        need_invite = []
-        for user_id in db_ids:
-            if user_id not in conversation_ids:
-                need_invite.append(user_id)
+    async def _show_users_which_are_need_invite(
+        self, message: MessageMin, limit: int | None = None, peer_id: int | None = None
+    ):
+        conversation = self._get_target_conversation(message, peer_id)
+        conversation_ids = await self._get_conversation_vk_ids(conversation, accept_snapshot=True)
+        need_invite = self._get_users_which_are_need_invite(conversation_ids)[:limit]
         await self._api.send_named_links_from_user_ids(message.peer_id, need_invite)
 
-    async def _kick_users_which_are_not_in_db(self):
-        db_ids, conversation_ids = await self._get_db_and_conversation_vk_ids()
-        for user_id in conversation_ids:
-            if user_id in db_ids:
-                continue
-            await self._api.kick_user_conversation(user_id=user_id)
+    async def _kick_users_which_are_not_in_db(
+        self, message: MessageMin, peer_id: int | None = None, *, dry_run: bool = False
+    ):
+        conversation = self._get_target_conversation(message, peer_id)
+        # Пробный запуск ничего не меняет и может ответить по снимку,
+        # настоящее исключение всегда сверяется co свежим листом.
+        conversation_ids = await self._get_conversation_vk_ids(
+            conversation, accept_snapshot=dry_run
+        )
+        need_kick = self._get_users_which_are_need_kick(conversation_ids)
+
+        async def report(text: str) -> None:
+            await self._api.send_private_message(peer_id=message.peer_id, text=text)
+
+        # Исключение приходит событием 8, a не выходом (7), поэтому kicked_list не нужен.
+        job = BulkKick(self._api, conversation, report, concurrency=self._kick_concurrency)
+        await job.run(need_kick, dry_run=dry_run)
 
     async def _update_statuses_db_in_conversation(self, message: MessageMin):
-        conversation_ids = self._api.get_user_ids()
+        # Статус в таблице один на пользователя и всегда сверяется c основной беседой.
+        primary = self._api.primary
+        if not primary.is_admin(message.from_id):
+            raise CommandError(
+                dialog.permission.conversation_denied.format(peer_id=primary.peer_id)
+            )
+        conversation_ids = primary.get_user_ids()
         result = await self._sheets.update_vk_statuses(conversation_ids)
         await self._api.send_private_message(
             peer_id=message.peer_id,
             text=dialog.commands.count_updated_statuses.format(count=result),
         )
 
+    def request_members_reconcile(self) -> None:
+        """Запрашивает внеплановую сверку участников (например, после потери событий)."""
+        self._members_reconcile.set()
+
     async def _loop_checker(self) -> None:
-        logger.debug("Запуск цикла обновлений.")
+        """
+        Участники бесед отслеживаются по событиям входа и выхода. Полная сверка всех
+        бесед выполняется раз в _members_reconcile_sec или по запросу после возможной
+        потери событий long poll, но не чаще раза в _members_reconcile_min_interval_sec.
+        """
+        logger.debug("Запуск цикла сверки участников бесед.")
         while True:
-            await sleep(self._loop_checker_sleep_sec)
-            await self._api.load_conversation()
+            with suppress(TimeoutError):
+                await wait_for(self._members_reconcile.wait(), self._members_reconcile_sec)
+            self._members_reconcile.clear()
+            for conversation in self._api.conversations.values():
+                try:
+                    await conversation.load_members()
+                except Exception:
+                    logger.exception("Ошибка сверки участников беседы {}.", conversation.peer_id)
+            await sleep(self._members_reconcile_min_interval_sec)
+
+    async def _flush_transit_notifications(self) -> None:
+        try:
+            await wait_for(
+                gather(
+                    *(
+                        conversation.transit.flush()
+                        for conversation in self._api.conversations.values()
+                    )
+                ),
+                self._shutdown_timeout_sec,
+            )
+        except Exception:
+            logger.exception("Уведомления o входе и выходе не отправлены при остановке.")
+
+    async def _flush_read_receipts(self) -> None:
+        try:
+            await wait_for(self._api.receipts.flush(), self._shutdown_timeout_sec)
+        except Exception:
+            logger.exception("Отметки о прочтении не отправлены при остановке.")
+        logger.info(
+            "Отметки о прочтении: {}, сэкономлено вызовов: {}.",
+            self._api.receipts.stats,
+            self._api.receipts.stats.saved,
+        )
 
     async def test(self):
         await self._api.load_group()
-        await self._api.load_conversation()
-        await self._sheets.update_database()
-        db_ids = self._sheets.get_all_vk_ids()
-        conversation_ids = self._api.get_user_ids()
-        users = self._get_users_which_are_need_kick(db_ids, conversation_ids)
+        conversation_ids = await self._get_conversation_vk_ids(self._api.primary)
+        users = self._get_users_which_are_need_kick(conversation_ids)
         msg = await self._api.format_named_links_from_user_ids(users)
         logger.warning(msg)
 
     async def run(self) -> None:
         logger.info("Запуск vk менеджера.")
         await self._api.load_group()
-        await self._api.read_all_messages_from_conversation()
+        for conversation in self._api.conversations.values():
+            await conversation.read_all_messages()
+        outbound_task = create_task(self._api.outbound.run())
+        deletions_task = create_task(self._api.deletions.run())
+        receipts_task = create_task(self._api.receipts.run())
+        transit_tasks = [
+            create_task(conversation.transit.run())
+            for conversation in self._api.conversations.values()
+        ]
         checker_task = create_task(self._loop_checker())
-        await self.bot.run_polling()
-        await checker_task
+        try:
+            await self.bot.run_polling()
+            await checker_task
+        finally:
+            receipts_task.cancel()
+            for transit_task in transit_tasks:
+                transit_task.cancel()
+            deletions_task.cancel()
+            await self._flush_transit_notifications()
+            await self._flush_read_receipts()
+            outbound_task.cancel()
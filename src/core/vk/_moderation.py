@@ -0,0 +1,125 @@
+from asyncio import Semaphore, gather, sleep
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+
+from aiohttp import ClientError
+from loguru import logger
+from vkbottle import VKAPIError
+
+from ._utils import pack_messages
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable, Iterable
+
+    from ._api import ConversationAPI
+    from ._conversation import Conversation
+
+
+@dataclass(kw_only=True)
+class KickSummary:
+    total: int = 0
+    kicked: list[int] = field(default_factory=list)
+    skipped: list[int] = field(default_factory=list)
+    failed: dict[int, str] = field(default_factory=dict)
+    retried: int = 0
+    dry_run: bool = False
+
+    @property
+    def processed(self) -> int:
+        return len(self.kicked) + len(self.skipped) + len(self.failed)
+
+
+class BulkKick:
+    """
+    Массовое исключение пользователей из беседы.
+
+    Исключения выполняются параллельно, но не более concurrency одновременно; сами
+    вызовы идут через общую очередь исходящих запросов, поэтому подчиняются лимиту
+    и объединяются в execute. Временные ошибки (лимиты и сбои VK, сеть) повторяются
+    до max_retries раз c экспоненциальной паузой. Каждые progress_every обработанных
+    пользователей и в конце вызывается report c текстом прогресса.
+    """
+
+    transient_error_codes = frozenset({1, 6, 9, 10})
+
+    def __init__(
+        self,
+        api: ConversationAPI,
+        conversation: Conversation,
+        report: Callable[[str], Awaitable[object]],
+        *,
+        concurrency: int = 5,
+        max_retries: int = 3,
+        retry_delay_sec: float = 1,
+        progress_every: int = 25,
+    ):
+        self._api = api
+        self._conversation = conversation
+        self._report = report
+        self._semaphore = Semaphore(max(concurrency, 1))
+        self._max_retries = max_retries
+        self._retry_delay_sec = retry_delay_sec
+        self._progress_every = max(progress_every, 1)
+
+    def _is_transient(self, error: Exception) -> bool:
+        if isinstance(error, VKAPIError):
+            return error.code in self.transient_error_codes
+        return isinstance(error, (ClientError, TimeoutError, OSError))
+
+    async def _kick(self, user_id: int, summary: KickSummary) -> None:
+        async with self._semaphore:
+            attempt = 0
+            while True:
+                try:
+                    kicked = await self._conversation.kick_user(user_id)
+                except Exception as error:
+                    if attempt >= self._max_retries or not self._is_transient(error):
+                        logger.warning("Пользователь {} не исключен: {}", user_id, error)
+                        summary.failed[user_id] = str(error)
+                        break
+                    attempt += 1
+                    summary.retried += 1
+                    await sleep(self._retry_delay_sec * 2 ** (attempt - 1))
+                    continue
+                (summary.kicked if kicked else summary.skipped).append(user_id)
+                break
+
+        if summary.processed % self._progress_every == 0 and summary.processed < summary.total:
+            await self._report(
+                f"Исключение: обработано {summary.processed} из {summary.total}, "
+                f"ошибок {len(summary.failed)}."
+            )
+
+    async def run(self, user_ids: Iterable[int], *, dry_run: bool = False) -> KickSummary:
+        user_ids = set(user_ids)
+        admins = {user_id for user_id in user_ids if self._conversation.is_admin(user_id)}
+        targets = sorted(user_ids - admins)
+        summary = KickSummary(total=len(targets), skipped=sorted(admins), dry_run=dry_run)
+        summary.total += len(admins)
+
+        if dry_run:
+            header = (
+                f"Пробный запуск: будет исключено {len(targets)}, пропущено админов {len(admins)}."
+            )
+            lines = await self._api.get_named_link_lines(targets)
+            for text in pack_messages([(header, lines)]):
+                await self._report(text)
+            return summary
+
+        await self._report(f"Начато исключение {len(targets)} пользователей.")
+        await gather(*(self._kick(user_id, summary) for user_id in targets))
+        for text in self.format_summary(summary):
+            await self._report(text)
+        logger.info("Массовое исключение завершено: {}", summary)
+        return summary
+
+    @staticmethod
+    def format_summary(summary: KickSummary) -> list[str]:
+        """Итог исключения, разбитый на сообщения; список ошибок переносится c заголовком."""
+        header = (
+            f"Исключение завершено. Исключено: {len(summary.kicked)} из {summary.total}, "
+            f"пропущено: {len(summary.skipped)}, ошибок: {len(summary.failed)}, "
+            f"повторов: {summary.retried}."
+        )
+        lines = [f"\n@id{user_id}: {error}" for user_id, error in summary.failed.items()]
+        return pack_messages([(header, lines)])
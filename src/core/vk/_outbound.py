@@ -0,0 +1,146 @@
+from asyncio import Event, Future, Task, create_task, get_running_loop
+from dataclasses import dataclass
+from enum import IntEnum
+from heapq import heappop, heappush
+from itertools import count
+from json import dumps
+from typing import TYPE_CHECKING, Any
+
+from loguru import logger
+from vkbottle import VKAPIError
+
+from utils import TokenBucket
+
+if TYPE_CHECKING:
+    from vkbottle import API
+
+
+class Priority(IntEnum):
+    MODERATION = 0
+    REPLY = 1
+    MESSAGE = 2
+    NOTIFICATION = 3
+
+
+_QueuedCall = tuple[Priority, int, str, dict[str, Any], Future]
+
+
+@dataclass(kw_only=True)
+class OutboundStats:
+    calls: int = 0
+    requests: int = 0
+    batched_calls: int = 0
+    throttled: int = 0
+    failed: int = 0
+
+
+class OutboundPipeline:
+    """
+    Очередь исходящих вызовов VK API.
+
+    Вызовы ставятся в очередь c приоритетом (удаления при модерации раньше,
+    уведомления позже) и отправляются не чаще requests_per_second запросов в секунду.
+    Накопившиеся за время ожидания лимита вызовы уходят одним execute (до 25 штук).
+    Каждый вызов получает свой Future, поэтому вызывающий просто ждет результат.
+    """
+
+    max_batch = 25
+
+    def __init__(self, api: API, *, requests_per_second: int = 20):
+        self._api = api
+        self._bucket = TokenBucket(requests_per_second * 60, capacity=requests_per_second)
+        self._queue: list[_QueuedCall] = []
+        self._sequence = count()
+        self._wakeup = Event()
+        self._sending: set[Task] = set()
+        self.stats = OutboundStats()
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    def call(
+        self, method: str, params: dict[str, Any], priority: Priority = Priority.MESSAGE
+    ) -> Future:
+        future = get_running_loop().create_future()
+        heappush(self._queue, (priority, next(self._sequence), method, params, future))
+        self.stats.calls += 1
+        self._wakeup.set()
+        return future
+
+    async def request(
+        self, method: str, params: dict[str, Any], priority: Priority = Priority.MESSAGE
+    ) -> Any:
+        return await self.call(method, params, priority)
+
+    def _take_batch(self) -> list[_QueuedCall]:
+        batch = []
+        while self._queue and len(batch) < self.max_batch:
+            queued = heappop(self._queue)
+            if not queued[4].cancelled():
+                batch.append(queued)
+        return batch
+
+    @staticmethod
+    def build_code(batch: list[_QueuedCall]) -> str:
+        calls = ",".join(
+            f"API.{method}({dumps(params, ensure_ascii=False)})"
+            for _, _, method, params, _ in batch
+        )
+        return f"return [{calls}];"
+
+    async def _send(self, batch: list[_QueuedCall]) -> None:
+        self.stats.requests += 1
+        try:
+            if len(batch) == 1:
+                _, _, method, params, future = batch[0]
+                response = await self._api.request(method, params)
+                if not future.done():
+                    future.set_result(response["response"])
+                return
+            self.stats.batched_calls += len(batch)
+            response = await self._api.request("execute", {"code": self.build_code(batch)})
+        except Exception as error:
+            self.stats.failed += len(batch)
+            for *_, future in batch:
+                if not future.done():
+                    future.set_exception(error)
+            return
+
+        errors = iter(response.get("execute_errors", ()))
+        for (_, _, method, _, future), result in zip(batch, response["response"], strict=False):
+            if future.done():
+                continue
+            if result is False:
+                error = next(errors, {})
+                self.stats.failed += 1
+                future.set_exception(
+                    VKAPIError[error.get("error_code", 0)](
+                        error_msg=f"{method}: {error.get('error_msg', 'execute error')}"
+                    )
+                )
+            else:
+                future.set_result(result)
+        for *_, future in batch:
+            if not future.done():
+                future.set_exception(VKAPIError[0](error_msg="execute returned no result"))
+
+    async def run(self) -> None:
+        try:
+            while True:
+                await self._wakeup.wait()
+                self._wakeup.clear()
+                while self._queue:
+                    if await self._bucket.acquire():
+                        self.stats.throttled += 1
+                    batch = self._take_batch()
+                    if not batch:
+                        continue
+                    task = create_task(self._send(batch))
+                    self._sending.add(task)
+                    task.add_done_callback(self._sending.discard)
+        finally:
+            for *_, future in self._queue:
+                future.cancel()
+            self._queue.clear()
+            if self.stats.calls:
+                logger.debug("Исходящие вызовы VK: {}", self.stats)
@@ -0,0 +1,161 @@
+from asyncio import (
+    Future,
+    Task,
+    create_task,
+    gather,
+    get_running_loop,
+    shield,
+    sleep,
+)
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import partial
+from time import monotonic
+from typing import TYPE_CHECKING
+
+from loguru import logger
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    from vkbottle import API
+
+
+@dataclass(kw_only=True)
+class ProfileStats:
+    hits: int = 0
+    misses: int = 0
+    requests: int = 0
+    failed: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class ProfileResolver:
+    """
+    Полные имена пользователей VK c пакетной загрузкой.
+
+    Имена хранятся в LRU-кеше ограниченного размера c временем жизни ttl_sec.
+    Промахи, накопленные за batch_delay_sec, загружаются одним users.get (до 1000 id
+    за запрос). Одновременные запросы одного id ждут одну и ту же загрузку.
+    """
+
+    max_ids_per_request = 1000
+
+    def __init__(
+        self,
+        api: API,
+        *,
+        max_size: int = 5000,
+        ttl_sec: float = 24 * 60 * 60,
+        batch_delay_sec: float = 0.01,
+    ):
+        self._api = api
+        self._max_size = max_size
+        self._ttl_sec = ttl_sec
+        self._batch_delay_sec = batch_delay_sec
+        self._cache: OrderedDict[int, tuple[str, float]] = OrderedDict()
+        self._in_flight: dict[int, Future[str | None]] = {}
+        self._pending: list[int] = []
+        self._flush_task: Task | None = None
+        self.stats = ProfileStats()
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def put(self, user_id: int, full_name: str) -> None:
+        self._cache[user_id] = (full_name, monotonic() + self._ttl_sec)
+        self._cache.move_to_end(user_id)
+        while len(self._cache) > self._max_size:
+            self._cache.popitem(last=False)
+
+    def get_cached(self, user_id: int) -> str | None:
+        cached = self._cache.get(user_id)
+        if cached is None:
+            return None
+        full_name, expires_at = cached
+        if expires_at <= monotonic():
+            del self._cache[user_id]
+            return None
+        self._cache.move_to_end(user_id)
+        return full_name
+
+    async def get(self, user_id: int) -> str | None:
+        return (await self.resolve((user_id,))).get(user_id)
+
+    async def resolve(self, user_ids: Iterable[int]) -> dict[int, str | None]:
+        """Имена для переданных id пользователей (id групп пропускаются)."""
+        names: dict[int, str | None] = {}
+        waiting: dict[int, Future[str | None]] = {}
+        for user_id in user_ids:
+            if user_id < 0 or user_id in names or user_id in waiting:
+                continue
+            full_name = self.get_cached(user_id)
+            if full_name is not None:
+                self.stats.hits += 1
+                names[user_id] = full_name
+                continue
+            self.stats.misses += 1
+            waiting[user_id] = self._in_flight.get(user_id) or self._enqueue(user_id)
+
+        if waiting:
+            results = await gather(*(shield(future) for future in waiting.values()))
+            names.update(zip(waiting, results, strict=True))
+        return names
+
+    def _enqueue(self, user_id: int) -> Future[str | None]:
+        future = get_running_loop().create_future()
+        self._in_flight[user_id] = future
+        if not self._pending:
+            self._flush_task = create_task(self._flush())
+            self._flush_task.add_done_callback(partial(self._cancel_batch, self._pending))
+        self._pending.append(user_id)
+        return future
+
+    async def _flush(self) -> None:
+        await sleep(self._batch_delay_sec)
+        pending, self._pending = self._pending, []
+        for start in range(0, len(pending), self.max_ids_per_request):
+            await self._load(pending[start : start + self.max_ids_per_request])
+
+    def _cancel_batch(self, batch: list[int], task: Task) -> None:
+        """После отмены загрузки ожидающие id этого пакета получают отмену, a не зависают."""
+        if not task.cancelled():
+            return
+        if self._pending is batch:
+            self._pending = []
+        for user_id in batch:
+            future = self._in_flight.pop(user_id, None)
+            if future is not None and not future.done():
+                future.cancel()
+
+    async def _load(self, user_ids: list[int]) -> None:
+        self.stats.requests += 1
+        try:
+            users = await self._api.users.get(user_ids=user_ids)
+        except Exception as error:
+            self.stats.failed += 1
+            for user_id in user_ids:
+                future = self._in_flight.pop(user_id)
+                if not future.done():
+                    future.set_exception(error)
+            return
+
+        # Ожидающие получают имена из ответа: кеш меньше пакета мог уже вытеснить часть.
+        loaded = {user.id: f"{user.first_name} {user.last_name}" for user in users}
+        for user_id, full_name in loaded.items():
+            self.put(user_id, full_name)
+        for user_id in user_ids:
+            future = self._in_flight.pop(user_id)
+            if not future.done():
+                future.set_result(loaded.get(user_id))
+        logger.debug(
+            "Загружено имен: {} из {}. Кеш: {} записей, попаданий {:.0%}.",
+            len(users),
+            len(user_ids),
+            len(self._cache),
+            self.stats.hit_ratio,
+        )
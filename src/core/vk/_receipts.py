@@ -0,0 +1,65 @@
+from asyncio import Event, gather, sleep
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from loguru import logger
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable
+
+
+@dataclass(kw_only=True)
+class ReceiptStats:
+    marked: int = 0
+    sent: int = 0
+    failed: int = 0
+
+    @property
+    def saved(self) -> int:
+        """Сколько вызовов mark_as_read удалось не делать."""
+        return self.marked - self.sent - self.failed
+
+
+class ReadReceipts:
+    """
+    Отложенные отметки прочтения сообщений.
+
+    mark() только запоминает наибольший id сообщения для каждого диалога. run() отправляет
+    накопленные отметки сразу после первой и далее не чаще раза в interval_sec,
+    по одному вызову на диалог. flush() отправляет все накопленное немедленно.
+    """
+
+    def __init__(
+        self, mark_as_read: Callable[[int, int], Awaitable[object]], *, interval_sec: float = 5
+    ):
+        self._mark_as_read = mark_as_read
+        self._interval_sec = interval_sec
+        self._pending: dict[int, int] = {}
+        self._wakeup = Event()
+        self.stats = ReceiptStats()
+
+    def mark(self, peer_id: int, message_id: int) -> None:
+        self.stats.marked += 1
+        if message_id > self._pending.get(peer_id, 0):
+            self._pending[peer_id] = message_id
+        self._wakeup.set()
+
+    async def _send(self, peer_id: int, message_id: int) -> None:
+        try:
+            await self._mark_as_read(peer_id, message_id)
+        except Exception as error:
+            self.stats.failed += 1
+            logger.warning("Отметка о прочтении в диалоге {} не отправлена: {}", peer_id, error)
+        else:
+            self.stats.sent += 1
+
+    async def flush(self) -> None:
+        pending, self._pending = self._pending, {}
+        await gather(*(self._send(peer_id, message_id) for peer_id, message_id in pending.items()))
+
+    async def run(self) -> None:
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            await self.flush()
+            await sleep(self._interval_sec)
@@ -0,0 +1,57 @@
+from asyncio import Event, sleep
+from typing import TYPE_CHECKING
+
+from loguru import logger
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable
+
+
+class TransitDigest:
+    """
+    Уведомления про вход и выход участников беседы.
+
+    Первое событие после затишья отправляется сразу отдельным сообщением. События,
+    пришедшие в следующие window_sec, копятся и отправляются одной сводкой в конце окна;
+    пока события продолжаются, сводка выходит не чаще раза в window_sec.
+    """
+
+    def __init__(
+        self,
+        send_single: Callable[[int, bool], Awaitable[object]],
+        send_digest: Callable[[list[int], list[int]], Awaitable[object]],
+        *,
+        window_sec: float = 60,
+    ):
+        self._send_single = send_single
+        self._send_digest = send_digest
+        self._window_sec = window_sec
+        self._events: list[tuple[int, bool]] = []
+        self._wakeup = Event()
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def add(self, user_id: int, *, joined: bool) -> None:
+        self._events.append((user_id, joined))
+        self._wakeup.set()
+
+    async def flush(self) -> None:
+        events, self._events = self._events, []
+        if len(events) == 1:
+            user_id, joined = events[0]
+            await self._send_single(user_id, joined)
+        elif events:
+            joined = [user_id for user_id, is_join in events if is_join]
+            left = [user_id for user_id, is_join in events if not is_join]
+            await self._send_digest(joined, left)
+
+    async def run(self) -> None:
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Ошибка отправки уведомления о входе или выходе.")
+            await sleep(self._window_sec)
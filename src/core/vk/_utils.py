@@ -1,5 +1,46 @@
+from itertools import count
 from time import time
 
+PEER_ID_OFFSET = 2000000000
+MAX_MESSAGE_LENGTH = 4096
+_RANDOM_ID_LIMIT = 2**31
+_random_ids = count(int(time() * 1000) % _RANDOM_ID_LIMIT)
+
 
 def get_random_id() -> int:
-    return int(time() * 1000)
+    """
+    Уникальный в пределах процесса random_id для messages.send. Счетчик стартует
+    c текущего времени в мс, поэтому id не повторяют выданные до перезапуска.
+    """
+    return next(_random_ids) % _RANDOM_ID_LIMIT
+
+
+def to_peer_id(value: str) -> int:
+    """peer_id беседы из аргумента команды: принимает и peer_id, и номер беседы (chat_id)."""
+    peer_id = int(value)
+    return peer_id if peer_id >= PEER_ID_OFFSET else peer_id + PEER_ID_OFFSET
+
+
+def pack_messages(
+    sections: list[tuple[str, list[str]]], max_length: int = MAX_MESSAGE_LENGTH
+) -> list[str]:
+    """
+    Раскладывает разделы (заголовок, строки) по сообщениям не длиннее max_length,
+    повторяя заголовок раздела при переносе.
+    """
+    messages: list[str] = []
+    text = ""
+    for header, lines in sections:
+        first_line = lines[0] if lines else ""
+        if text and len(text) + len(header) + len(first_line) + 2 > max_length:
+            messages.append(text)
+            text = ""
+        text = f"{text}\n\n{header}" if text else header
+        for line in lines:
+            if len(text) + len(line) > max_length:
+                messages.append(text)
+                text = header
+            text += line
+    if text:
+        messages.append(text)
+    return messages
@@ -3,11 +3,14 @@ from typing import TYPE_CHECKING, Any
 
 from vkbottle import API, Bot, LoopWrapper, SingleAiohttpClient
 from vkbottle.modules import logger
+from vkbottle.polling.base import FailureCode
 from vkbottle.polling.user_polling import UserPolling
 
 from ._labeler import Labeler
 
 if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable
+
     from vkbottle.api import ABCAPI, Token
     from vkbottle.callback import ABCCallback
     from vkbottle.dispatch import ABCRouter, ABCStateDispenser
@@ -32,6 +35,17 @@ class BotMessagesPooling(UserPolling):
     ):
         super().__init__(api, wait, mode, rps_delay, error_handler)
         self.group_id = group_id
+        self.gap_handlers: list[Callable[[], None]] = []
+
+    def _notify_gap(self) -> None:
+        for handler in self.gap_handlers:
+            handler()
+
+    async def handle_failed_event(self, server: dict, event: dict) -> dict:
+        # При KEY_EXPIRED события не теряются: сервер переполучается c прежним ts.
+        if event.get("failed") in (FailureCode.HISTORY_OUTDATED, FailureCode.INFORMATION_LOST):
+            self._notify_gap()
+        return await super().handle_failed_event(server, event)
 
     async def get_server(self) -> dict:
         logger.debug("Getting polling server...")
@@ -51,7 +65,7 @@ class CustomLoopWrapper(LoopWrapper):
 class BotUserLongPool(Bot):
     def __init__(
         self,
-        conversation_id: int,
+        conversation_ids: Iterable[int],
         token: Token | None = None,
         polling: ABCPolling | None = None,
         callback: ABCCallback | None = None,
@@ -63,7 +77,7 @@ class BotUserLongPool(Bot):
     ) -> None:
 
         polling = polling or BotMessagesPooling()
-        labeler = labeler or Labeler(conversation_id=conversation_id)
+        labeler = labeler or Labeler(conversation_ids=conversation_ids)
 
         loop_wrapper = CustomLoopWrapper(loop=get_running_loop())
         loop_wrapper.set_running(True)
@@ -85,3 +99,8 @@ class BotUserLongPool(Bot):
     @property
     def on(self) -> Labeler:
         return self.labeler
+
+    def on_events_gap(self, handler: Callable[[], None]) -> None:
+        """Регистрирует обработчик возможной потери событий long poll."""
+        if isinstance(self._polling, BotMessagesPooling):
+            self._polling.gap_handlers.append(handler)
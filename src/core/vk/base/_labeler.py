@@ -5,7 +5,7 @@ from vkbottle.dispatch.views.user import ABCUserMessageView, RawUserEventView, U
 from vkbottle.framework.labeler import UserLabeler
 
 if TYPE_CHECKING:
-    from collections.abc import Callable
+    from collections.abc import Callable, Iterable
 
     from vkbottle import ABCRule
     from vkbottle.tools.mini_types.bot import MessageMin
@@ -16,14 +16,15 @@ if TYPE_CHECKING:
 class Labeler(UserLabeler):
     def __init__(
         self,
-        conversation_id: int | None,
+        conversation_ids: Iterable[int] | None,
         message_view: ABCUserMessageView | None = None,
         raw_event_view: RawUserEventView | None = None,
         custom_rules: dict[str, type[ABCRule]] | None = None,
         auto_rules: list[ABCRule] | None = None,
         raw_event_auto_rules: list[ABCRule] | None = None,
     ):
-        self._conversation_id = conversation_id
+        # FromPeerRule проверяет peer_id через "in", множество дает O(1) на событие.
+        self._conversation_ids = frozenset(conversation_ids or ())
         message_view = message_view or UserMessageView()
         raw_event_view = raw_event_view or RawUserEventView()
         super().__init__(
@@ -37,6 +38,6 @@ class Labeler(UserLabeler):
     def conversation_message(
         self, *rules: ABCRule, blocking: bool = True, **custom_rules
     ) -> LabeledMessageHandler:
-        if self._conversation_id:
-            rules = (*rules, FromPeerRule([self._conversation_id]))
+        if self._conversation_ids:
+            rules = (*rules, FromPeerRule(self._conversation_ids))
         return super().chat_message(*rules, blocking=blocking, **custom_rules)
@@ -1,3 +1,5 @@
 from ._api import GoogleSheetsApiClient
+from ._discovery import DiscoveryCache
+from ._limiter import SheetsApiStats
 
-__all__ = ["GoogleSheetsApiClient"]
+__all__ = ["DiscoveryCache", "GoogleSheetsApiClient", "SheetsApiStats"]
@@ -1,15 +1,28 @@
+from asyncio import sleep
+from random import uniform
+from time import perf_counter
 from typing import TYPE_CHECKING
 
 from aiogoogle import Aiogoogle
 from aiogoogle.auth.creds import ServiceAccountCreds
+from aiogoogle.excs import HTTPError
+from aiogoogle.resource import GoogleAPI
+from aiogoogle.sessions.aiohttp_session import AiohttpSession
+from aiohttp import ClientError, TCPConnector
+from loguru import logger
 
-from ._utils import get_service_account_creds_with_path
+from utils import TokenBucket
+
+from ._limiter import SheetsApiStats
+from ._utils import get_retry_after, get_service_account_creds_with_path
 
 if TYPE_CHECKING:
     from pathlib import Path
 
     from aiogoogle.resource import Resource
 
+    from ._discovery import DiscoveryCache
+
 
 class GoogleSheetsApiClient:
     """
@@ -21,29 +34,149 @@ class GoogleSheetsApiClient:
         "https://www.googleapis.com/auth/spreadsheets",
         "https://www.googleapis.com/auth/drive",
     )
+    retryable_statuses = frozenset({408, 429, 500, 502, 503, 504})
 
-    def __init__(self, service_account_path: Path, spreadsheet_id: str):
+    def __init__(
+        self,
+        service_account_path: Path,
+        spreadsheet_id: str,
+        *,
+        read_requests_per_minute: int = 60,
+        write_requests_per_minute: int = 60,
+        max_retries: int = 5,
+        backoff_base_sec: float = 1,
+        backoff_max_sec: float = 64,
+        connections_limit: int = 10,
+        keepalive_timeout_sec: float = 300,
+        discovery_cache: DiscoveryCache | None = None,
+    ):
         service_account_creds = get_service_account_creds_with_path(service_account_path)
         creds = ServiceAccountCreds(scopes=self.scopes, **service_account_creds)
         self._aiogoogle = Aiogoogle(service_account_creds=creds)
         self._spreadsheet_id = spreadsheet_id
         self._sheets_service: Resource | None = None
+        self._drive_files_service: Resource | None = None
+        self._session: AiohttpSession | None = None
+        self._connections_limit = connections_limit
+        self._keepalive_timeout_sec = keepalive_timeout_sec
+        self._discovery_cache = discovery_cache
+        self.connect_timings: dict[str, float] = {}
 
-    async def connect(self) -> None:
-        async with self._aiogoogle as aiogoogle:
-            self._sheets_service = (await aiogoogle.discover("sheets", "v4")).spreadsheets
+        self._read_bucket = TokenBucket(read_requests_per_minute)
+        self._write_bucket = TokenBucket(write_requests_per_minute)
+        self._max_retries = max_retries
+        self._backoff_base_sec = backoff_base_sec
+        self._backoff_max_sec = backoff_max_sec
+        self.stats = SheetsApiStats()
 
-    async def _send_request(self, request):
+    async def discover(self, api_name: str, api_version: str) -> GoogleAPI:
+        """Discovery-документ API из дискового кеша, при промахе кеша - из сети."""
+        if self._discovery_cache:
+            document = self._discovery_cache.load(api_name, api_version)
+            if document is not None:
+                logger.debug("Discovery-документ {} {} загружен из кеша.", api_name, api_version)
+                return GoogleAPI(document)
         async with self._aiogoogle as aiogoogle:
-            return await aiogoogle.as_service_account(request)
+            api = await aiogoogle.discover(api_name, api_version)
+        if self._discovery_cache:
+            self._discovery_cache.save(api_name, api_version, api.discovery_document)
+        return api
+
+    async def connect(self) -> None:
+        if self._session is None:
+            connector = TCPConnector(
+                limit=self._connections_limit, keepalive_timeout=self._keepalive_timeout_sec
+            )
+            self._session = AiohttpSession(connector=connector)
+
+        started = perf_counter()
+        self._sheets_service = (await self.discover("sheets", "v4")).spreadsheets
+        discovered = perf_counter()
+        await self._aiogoogle.service_account_manager.refresh()
+        self.connect_timings = {
+            "discovery": discovered - started,
+            "auth": perf_counter() - discovered,
+        }
+
+    @property
+    def connected(self) -> bool:
+        return self._session is not None and self._sheets_service is not None
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _execute(self, request):
+        """
+        Отправка запроса через общую сессию c пулом keep-alive соединений.
+        Токен сервисного аккаунта aiogoogle обновляет сам, за 2 минуты до истечения.
+        """
+        if self._session is None:
+            msg = "SheetsApiClient not connected!"
+            raise ConnectionError(msg)
+        manager = self._aiogoogle.service_account_manager
+        await manager.refresh()
+        return await self._session.send(
+            manager.authorize(request),
+            session_factory=self._aiogoogle.session_factory,
+            auth_manager=manager,
+        )
+
+    def _get_retry_delay(self, attempt: int, error: Exception) -> float | None:
+        """Пауза перед повтором или None, если ошибка не подлежит повтору."""
+        if isinstance(error, HTTPError):
+            if error.res is None or error.res.status_code not in self.retryable_statuses:
+                return None
+            retry_after = get_retry_after(error.res.headers)
+            if retry_after is not None:
+                return retry_after
+        backoff = min(self._backoff_max_sec, self._backoff_base_sec * 2**attempt)
+        return uniform(0, backoff)
+
+    async def _send_request(self, request, *, write: bool = False):
+        bucket = self._write_bucket if write else self._read_bucket
+        attempt = 0
+        while True:
+            if await bucket.acquire():
+                self.stats.throttled += 1
+            self.stats.requests += 1
+            try:
+                return await self._execute(request)
+            except (HTTPError, ClientError, TimeoutError, OSError) as error:
+                delay = self._get_retry_delay(attempt, error)
+                if delay is None or attempt >= self._max_retries:
+                    self.stats.failed += 1
+                    raise
+                attempt += 1
+                self.stats.retried += 1
+                logger.warning(
+                    "Запрос к Google Sheets не выполнен ({}). Повтор {}/{} через {:.1f} с.",
+                    error,
+                    attempt,
+                    self._max_retries,
+                    delay,
+                )
+                await sleep(delay)
 
     @property
     def sheets_service(self) -> Resource:
-        if hasattr(self, "_sheets_service"):
+        if self._sheets_service is not None:
             return self._sheets_service
         msg = "SheetsApiClient not connected!"
         raise ConnectionError(msg)
 
+    async def get_spreadsheet_version(self) -> str:
+        """
+        Версия файла таблицы по Drive API. Растет при любом изменении таблицы,
+        поэтому подходит для дешевой проверки изменений без чтения листа.
+        """
+        if self._drive_files_service is None:
+            self._drive_files_service = (await self.discover("drive", "v3")).files
+        request = self._drive_files_service.get(fileId=self._spreadsheet_id, fields="version")
+        resp: dict = await self._send_request(request)
+        return str(resp["version"])
+
     async def get_values(self, sheet_range: str) -> list[str | None]:
         """Получить значения по диапазону. Пример диапазонов: 'List!A1' или 'List!A1:A2'"""
         request = self.sheets_service.values.get(
@@ -63,6 +196,24 @@ class GoogleSheetsApiClient:
         resp: dict = await self._send_request(request)
         return [r.get("values", [[]])[0] for r in resp.get("valueRanges")]
 
+    async def batch_get_blocks(
+        self, sheet_ranges: list[str], major_dimension: str = "ROWS"
+    ) -> list[list[list[str]]]:
+        """
+        Получить все строки (или столбцы при major_dimension="COLUMNS") по группе
+        диапазонов одним запросом. Пример диапазона: ['List!A1:N250', 'List!A251:N500'].
+        Пустые строки в конце диапазона API не возвращает. Ответ ограничен маской полей
+        и содержит только значения.
+        """
+        request = self.sheets_service.values.batchGet(
+            spreadsheetId=self._spreadsheet_id,
+            ranges=sheet_ranges,
+            majorDimension=major_dimension,
+            fields="valueRanges(values)",
+        )
+        resp: dict = await self._send_request(request)
+        return [r.get("values", []) for r in resp.get("valueRanges")]
+
     async def update_values(
         self, sheet_range: str, values: list[str], range_type: str = "ROWS"
     ) -> None:
@@ -73,9 +224,11 @@ class GoogleSheetsApiClient:
             valueInputOption="USER_ENTERED",
             json=body,
         )
-        await self._send_request(request)
+        await self._send_request(request, write=True)
 
     async def batch_update_values(self, sheet_ranges: list[str], values: list[list[str]]) -> None:
+        if not sheet_ranges:
+            return
         body = {
             "valueInputOption": "USER_ENTERED",
             "data": [
@@ -85,4 +238,17 @@ class GoogleSheetsApiClient:
         request = self.sheets_service.values.batchUpdate(
             spreadsheetId=self._spreadsheet_id, json=body
         )
-        await self._send_request(request)
+        await self._send_request(request, write=True)
+
+    async def batch_update_ranges(self, data: list[tuple[str, list[list[str]]]]) -> None:
+        """Записать группу прямоугольных диапазонов. Пример: [('List!M5:M6', [['TRUE'], ['FALSE']])]"""
+        if not data:
+            return
+        body = {
+            "valueInputOption": "USER_ENTERED",
+            "data": [{"range": r, "values": v} for r, v in data],
+        }
+        request = self.sheets_service.values.batchUpdate(
+            spreadsheetId=self._spreadsheet_id, json=body
+        )
+        await self._send_request(request, write=True)
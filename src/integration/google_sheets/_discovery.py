@@ -0,0 +1,56 @@
+from json import JSONDecodeError, dumps, loads
+from time import time
+from typing import TYPE_CHECKING
+
+from loguru import logger
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+
+class DiscoveryCache:
+    """
+    Дисковый кеш discovery-документов Google API.
+
+    Документ хранится вместе c версией формата кеша и временем сохранения.
+    Устаревший по TTL документ, документ другой версии API или другого формата кеша
+    считается отсутствующим и загружается заново.
+    """
+
+    format_version = 1
+
+    def __init__(self, directory: Path, ttl_sec: float):
+        self._directory = directory
+        self._ttl_sec = ttl_sec
+
+    def _get_path(self, api_name: str, api_version: str) -> Path:
+        return self._directory / f"{api_name}_{api_version}.json"
+
+    def load(self, api_name: str, api_version: str) -> dict | None:
+        path = self._get_path(api_name, api_version)
+        try:
+            with path.open(encoding="utf-8") as file:
+                cached = loads(file.read())
+        except FileNotFoundError:
+            return None
+        except (OSError, JSONDecodeError) as error:
+            logger.warning("Кеш discovery-документа {} поврежден: {}", path.name, error)
+            return None
+
+        document = cached.get("document") or {}
+        if (
+            cached.get("format_version") != self.format_version
+            or document.get("version") != api_version
+            or time() - cached.get("saved_at", 0) > self._ttl_sec
+        ):
+            return None
+        return document
+
+    def save(self, api_name: str, api_version: str, document: dict) -> None:
+        path = self._get_path(api_name, api_version)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        cached = {"format_version": self.format_version, "saved_at": time(), "document": document}
+        tmp_path = path.with_suffix(".tmp")
+        with tmp_path.open(mode="w", encoding="utf-8") as file:
+            file.write(dumps(cached, ensure_ascii=False))
+        tmp_path.replace(path)
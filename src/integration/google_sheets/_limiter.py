@@ -0,0 +1,9 @@
+from dataclasses import dataclass
+
+
+@dataclass(kw_only=True)
+class SheetsApiStats:
+    requests: int = 0
+    throttled: int = 0
+    retried: int = 0
+    failed: int = 0
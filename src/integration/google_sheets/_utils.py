@@ -2,6 +2,7 @@ from json import loads
 from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
+    from collections.abc import Mapping
     from pathlib import Path
 
 
@@ -12,3 +13,14 @@ def get_service_account_creds_with_path(path: Path) -> dict[str, str]:
     except FileNotFoundError as e:
         msg = f"Credentials file not found! {path}"
         raise FileNotFoundError(msg) from e
+
+
+def get_retry_after(headers: Mapping[str, str] | None) -> float | None:
+    """Значение заголовка Retry-After в секундах (поддерживается только числовой вид)."""
+    if not headers:
+        return None
+    value = headers.get("Retry-After") or headers.get("retry-after")
+    try:
+        return max(float(value), 0) if value is not None else None
+    except ValueError:
+        return None
@@ -1,30 +1,104 @@
+from typing import TYPE_CHECKING, Literal
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 from constants import BASE_PATH
 
+if TYPE_CHECKING:
+    from pathlib import Path
+
 
 class ApplicationSettings(BaseSettings):
     GROUP_ACCESS_TOKEN: str
 
-    CONVERSATION_ID: int
+    CONVERSATION_ID: int | None = None
+    CONVERSATION_IDS: list[int] = []
     NOTIFICATION_JOIN_OFFSET: int = 20
     ADMINS_CONVERSATION_ID: int
+    VK_REQUESTS_PER_SECOND: int = 20
+    VK_TRANSIT_DIGEST_WINDOW_SEC: int = 60
+    VK_READ_RECEIPTS_INTERVAL_SEC: int = 5
+    VK_MEMBERS_RECONCILE_SEC: int = 60 * 60
+    VK_MEMBERS_RECONCILE_MIN_INTERVAL_SEC: int = 60
+    VK_FLOOD_WINDOW_SEC: int = 10
+    VK_FLOOD_WARN_AFTER: int = 5
+    VK_FLOOD_DELETE_AFTER: int = 8
+    VK_FLOOD_MUTE_AFTER: int = 12
+    VK_FLOOD_MUTE_SEC: int = 5 * 60
+    VK_FLOOD_MAX_AUTHORS: int = 1000
+    VK_FLOOD_DELETE_DELAY_SEC: int = 1
+    VK_KICK_CONCURRENCY: int = 5
+    VK_DELETION_QUEUE_FILENAME: str | None = "pending_deletions.json"
+    VK_DELETION_WINDOW_SEC: int = 1
+    VK_PROFILE_CACHE_SIZE: int = 5000
+    VK_PROFILE_CACHE_TTL_SEC: int = 24 * 60 * 60
 
     SHEETS_SERVICE_ACCOUNT_FILENAME: str = "service_account.json"
     SPREADSHEET_ID: str
+    SHEETS_READ_REQUESTS_PER_MINUTE: int = 60
+    SHEETS_WRITE_REQUESTS_PER_MINUTE: int = 60
+    SHEETS_MAX_RETRIES: int = 5
+    SHEETS_WRITE_MAX_PENDING: int = 50
+    SHEETS_WRITE_FLUSH_INTERVAL_SEC: int = 10
+    SHEETS_DISCOVERY_CACHE_DIRNAME: str | None = "discovery_cache"
+    SHEETS_DISCOVERY_CACHE_TTL_SEC: int = 7 * 24 * 60 * 60
     DATABASE_SHEET_NAME: str = "181Б"
+    DATABASE_SHEET_NAMES: list[str] = []
+    DATABASE_FETCH_CONCURRENCY: int = 4
     DATABASE_SHEET_START_RANGE: int = 1
     DATABASE_SHEET_END_RANGE: int = 500
+    DATABASE_FETCH_MODE: Literal["block", "rows"] = "block"
+    DATABASE_FETCH_CHUNK_ROWS: int = 500
+    DATABASE_FETCH_PROJECTION: bool = True
+    DATABASE_PARSE_EXECUTOR: Literal["process", "thread"] = "process"
+    DATABASE_PARSE_WORKERS: int = 2
+    DATABASE_PARSE_CHUNK_ROWS: int = 5000
+    DATABASE_PARSE_STALL_BUDGET_MS: int = 50
+    DATABASE_PARSE_TRACE_EVERY: int = 0
+    DATABASE_REFRESH_PERIOD_SEC: int = 60
+    DATABASE_REFRESH_JITTER_SEC: int = 10
+    DATABASE_MAX_STALENESS_SEC: int = 30 * 60
+    DATABASE_COMMAND_MAX_AGE_SEC: int = 30
+    DATABASE_CHANGE_PROBE: bool = True
     DATABASE_MOCK_FILENAME: str | None = None
+    DATABASE_SNAPSHOT_FILENAME: str | None = "hostel_snapshot.sqlite3"
+    DATABASE_SNAPSHOT_MAX_AGE_SEC: int = 12 * 60 * 60
 
     model_config = SettingsConfigDict(extra="forbid")
 
     def get_service_account_file_path(self) -> str:
         return BASE_PATH / self.SHEETS_SERVICE_ACCOUNT_FILENAME
 
+    def get_conversation_ids(self) -> list[int]:
+        conversation_ids = list(dict.fromkeys(self.CONVERSATION_IDS))
+        if not conversation_ids and self.CONVERSATION_ID is not None:
+            conversation_ids = [self.CONVERSATION_ID]
+        if not conversation_ids:
+            msg = "Не указаны беседы: задайте CONVERSATION_ID или CONVERSATION_IDS."
+            raise ValueError(msg)
+        return conversation_ids
+
+    def get_database_sheet_names(self) -> list[str]:
+        return self.DATABASE_SHEET_NAMES or [self.DATABASE_SHEET_NAME]
+
     def get_mock_database_path(self) -> str | None:
         return BASE_PATH / self.DATABASE_MOCK_FILENAME if self.DATABASE_MOCK_FILENAME else None
 
+    def get_deletion_queue_path(self) -> Path | None:
+        if not self.VK_DELETION_QUEUE_FILENAME:
+            return None
+        return BASE_PATH / self.VK_DELETION_QUEUE_FILENAME
+
+    def get_discovery_cache_path(self) -> Path | None:
+        if not self.SHEETS_DISCOVERY_CACHE_DIRNAME:
+            return None
+        return BASE_PATH / self.SHEETS_DISCOVERY_CACHE_DIRNAME
+
+    def get_snapshot_path(self) -> Path | None:
+        return (
+            BASE_PATH / self.DATABASE_SNAPSHOT_FILENAME if self.DATABASE_SNAPSHOT_FILENAME else None
+        )
+
     @classmethod
     def load(cls) -> ApplicationSettings:
         return ApplicationSettings()
@@ -1,4 +1,6 @@
 from .env_type import EnvType
 from .logger import setup_logging
+from .single_flight import SingleFlight
+from .token_bucket import TokenBucket
 
-__all__ = ["EnvType", "setup_logging"]
+__all__ = ["EnvType", "SingleFlight", "TokenBucket", "setup_logging"]
@@ -0,0 +1,32 @@
+from asyncio import Task, create_task, shield
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable
+
+
+class SingleFlight:
+    """
+    Объединяет одновременные вызовы одной корутины в одно выполнение.
+
+    Пока задача выполняется, новые вызовы ждут результат этой же задачи. Отмена одного
+    из ожидающих не отменяет общую задачу для остальных.
+    """
+
+    def __init__(self):
+        self._task: Task | None = None
+
+    @property
+    def in_flight(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    @staticmethod
+    def _consume_result(task: Task) -> None:
+        if not task.cancelled():
+            task.exception()
+
+    async def do(self, func: Callable[[], Awaitable[Any]]) -> Any:
+        if not self.in_flight:
+            self._task = create_task(func())
+            self._task.add_done_callback(self._consume_result)
+        return await shield(self._task)
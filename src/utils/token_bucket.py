@@ -0,0 +1,32 @@
+from asyncio import Lock, sleep
+from time import monotonic
+
+
+class TokenBucket:
+    """
+    Асинхронное ведро токенов: не более rate_per_minute запросов в минуту
+    c допустимым всплеском до capacity запросов.
+    """
+
+    def __init__(self, rate_per_minute: int, capacity: int | None = None):
+        self._rate = rate_per_minute / 60
+        self._capacity = float(capacity or rate_per_minute)
+        self._tokens = self._capacity
+        self._updated_at = monotonic()
+        self._lock = Lock()
+
+    def _refill(self) -> None:
+        now = monotonic()
+        self._tokens = min(self._capacity, self._tokens + (now - self._updated_at) * self._rate)
+        self._updated_at = now
+
+    async def acquire(self) -> bool:
+        """Забирает один токен. Возвращает True, если пришлось ждать."""
+        async with self._lock:
+            self._refill()
+            throttled = self._tokens < 1
+            while self._tokens < 1:
+                await sleep((1 - self._tokens) / self._rate)
+                self._refill()
+            self._tokens -= 1
+            return throttled
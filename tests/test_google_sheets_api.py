@@ -0,0 +1,163 @@
+"""
+Повторы, backoff и ведра токенов GoogleSheetsApiClient против локального
+заглушечного HTTP-сервера вместо Google Sheets.
+"""
+
+import json
+from asyncio import gather, run
+from time import perf_counter
+
+import pytest
+from aiogoogle.excs import HTTPError
+from aiogoogle.models import Request
+from aiogoogle.sessions.aiohttp_session import AiohttpSession
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from integration.google_sheets import GoogleSheetsApiClient
+
+
+class StubSheets:
+    """Отвечает по очереди заданными ответами, последний ответ повторяется."""
+
+    def __init__(self, *responses: tuple[int, dict[str, str]] | str):
+        self.responses = list(responses)
+        self.calls = 0
+
+    async def handle(self, request: web.Request) -> web.StreamResponse:
+        response = self.responses[min(self.calls, len(self.responses) - 1)]
+        self.calls += 1
+        if response == "disconnect":
+            # Сервер рвет соединение, как устаревшее keep-alive соединение пула.
+            request.transport.close()
+            return web.Response()
+        status, headers = response
+        return web.json_response({"status": status}, status=status, headers=headers)
+
+
+@pytest.fixture
+def service_account_path(tmp_path):
+    path = tmp_path / "service_account.json"
+    path.write_text(json.dumps({"type": "service_account", "client_email": "stub@example.com"}))
+    return path
+
+
+def make_client(service_account_path, **kwargs) -> GoogleSheetsApiClient:
+    client = GoogleSheetsApiClient(
+        service_account_path, "spreadsheet", backoff_base_sec=0.01, **kwargs
+    )
+    manager = client._aiogoogle.service_account_manager
+
+    async def refresh():
+        return False
+
+    manager.refresh = refresh
+    manager.authorize = lambda request: request
+    return client
+
+
+async def _send(client: GoogleSheetsApiClient, stub: StubSheets, requests: int, write: bool):
+    app = web.Application()
+    app.router.add_get("/values", stub.handle)
+    async with TestServer(app) as server:
+        # Соединение без discovery: запросы идут прямо на заглушку.
+        client._session = AiohttpSession()
+        try:
+            url = str(server.make_url("/values"))
+            return await gather(
+                *(
+                    client._send_request(Request(method="GET", url=url), write=write)
+                    for _ in range(requests)
+                )
+            )
+        finally:
+            await client.close()
+
+
+def send(client: GoogleSheetsApiClient, stub: StubSheets, requests: int = 1, *, write=False):
+    return run(_send(client, stub, requests, write))
+
+
+def test_retries_server_errors_until_success(service_account_path):
+    client = make_client(service_account_path)
+    stub = StubSheets((503, {}), (500, {}), (200, {}))
+
+    assert send(client, stub) == [{"status": 200}]
+    assert stub.calls == 3
+    assert client.stats.retried == 2
+    assert client.stats.requests == 3
+    assert client.stats.failed == 0
+
+
+def test_retries_dropped_connection(service_account_path):
+    client = make_client(service_account_path)
+    # aiohttp сам повторяет идемпотентный запрос один раз, дальше повторяет клиент.
+    stub = StubSheets("disconnect", "disconnect", "disconnect", "disconnect", (200, {}))
+
+    assert send(client, stub) == [{"status": 200}]
+    assert stub.calls == 5
+    assert client.stats.retried >= 1
+
+
+def test_respects_retry_after(service_account_path):
+    client = make_client(service_account_path, backoff_max_sec=0.01)
+    stub = StubSheets((429, {"Retry-After": "0.3"}), (200, {}))
+
+    started = perf_counter()
+    send(client, stub)
+    assert perf_counter() - started >= 0.3
+    assert client.stats.retried == 1
+
+
+def test_does_not_retry_client_errors(service_account_path):
+    client = make_client(service_account_path)
+    stub = StubSheets((400, {}))
+
+    with pytest.raises(HTTPError):
+        send(client, stub)
+    assert stub.calls == 1
+    assert client.stats.retried == 0
+    assert client.stats.failed == 1
+
+
+def test_gives_up_after_max_retries(service_account_path):
+    client = make_client(service_account_path, max_retries=2)
+    stub = StubSheets((502, {}))
+
+    with pytest.raises(HTTPError):
+        send(client, stub)
+    assert stub.calls == 3
+    assert client.stats.retried == 2
+    assert client.stats.failed == 1
+
+
+def test_backoff_is_capped_and_jittered(service_account_path):
+    client = make_client(service_account_path, backoff_max_sec=0.05)
+    error = OSError("reset")
+
+    for attempt in range(10):
+        delay = client._get_retry_delay(attempt, error)
+        assert 0 <= delay <= min(0.05, 0.01 * 2**attempt)
+
+
+def test_read_bucket_throttles_bursts_over_quota(service_account_path):
+    client = make_client(service_account_path, read_requests_per_minute=120)
+    stub = StubSheets((200, {}))
+
+    started = perf_counter()
+    send(client, stub, 121)
+    # Ведро на 120 запросов в минуту пропускает всплеск из 120, 121-й ждет токен полсекунды.
+    assert perf_counter() - started >= 0.4
+    assert client.stats.throttled == 1
+    assert stub.calls == 121
+
+
+def test_write_bucket_is_separate_from_read_bucket(service_account_path):
+    client = make_client(
+        service_account_path, read_requests_per_minute=1, write_requests_per_minute=60
+    )
+    stub = StubSheets((200, {}))
+
+    send(client, stub)
+    send(client, stub, 2, write=True)
+    assert client.stats.throttled == 0